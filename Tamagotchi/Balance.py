@@ -0,0 +1,202 @@
+"""
+Plays thousands of simulated lifetimes with different player strategies
+across a pool of processes, to see how changes to the rules play out
+without playing the game by hand.
+
+The rules are the constants in Engine. Each worker process sets the
+ones given in rules (see set_rules) before it plays, so the rules of the
+process that started the pool are never changed.
+
+python Balance.py [lives] [workers] [results file]
+plays every strategy in STRATEGIES and writes the results as JSON
+(balance.json by default).
+"""
+import os, sys, json, time, statistics
+from concurrent.futures import ProcessPoolExecutor
+from random import Random
+
+import Engine
+from Engine import Pet, STATS, MAX_AGE
+
+#The rules that can be changed, by the name of their constant in Engine.
+#PERIODS is a dictionary of the integers in UPDATE_SCHEDULE to their new periods.
+RULES = ['FEED_AMOUNT', 'GAME_AMOUNT', 'MEDICINE_AMOUNT', 'SICK_HEALTH', 'SICK_HAPPINESS',
+	'SICK_PERIOD', 'SLEEP_LENGTH', 'DECAY', 'PERIODS']
+
+
+def set_rules(rules):
+	"""
+	Changes the rules of the game in this process.
+	"""
+	for name, value in rules.items():
+		if name not in RULES:
+			raise ValueError('unknown rule ' + name)
+		if name == 'PERIODS':
+			Engine.PERIODS.update(value)
+			#changed in place so everything that imported them sees the new periods
+			Engine.UPDATE_SCHEDULE[:] = [(Engine.PERIODS[value], value) for period, value in Engine.UPDATE_SCHEDULE]
+		else:
+			setattr(Engine, name, value)
+
+
+class Strategy():
+	"""
+	A player that checks on the pet every period ticks and, at most once a check:
+		cleans and disciplines it when it asks, before anything else
+		gives it medicine medicine_delay ticks after it is seen to be sick
+		feeds it if its hunger is below feed_below
+		plays the happiness game if its happiness is below play_below,
+			winning with the chance win_rate
+		puts it to sleep when its health is below sleep_below
+	The engine refuses what the game wouldn't allow, like playing or
+	sleeping while the pet is sick.
+	Other strategies override act, they have to be defined at the top of
+	a module so they can be sent to the worker processes.
+	"""
+	def __init__(self, name, period=10, feed_below=50, play_below=50, win_rate=0.5, medicine_delay=0, sleep_below=30):
+		self.name = name
+		self.period = period
+		self.feed_below = feed_below
+		self.play_below = play_below
+		self.win_rate = win_rate
+		self.medicine_delay = medicine_delay
+		self.sleep_below = sleep_below
+
+	def act(self, engine, sick_for, random):
+		"""
+		Looks after the pet, sick_for is how many ticks it has been seen to be sick.
+		"""
+		pet = engine.pet
+		if pet.sleeping:
+			return
+		if pet.needs_cleaning:
+			engine.clean()
+		if pet.needs_discipline:
+			engine.discipline()
+		if pet.sick and sick_for >= self.medicine_delay:
+			engine.medicine()
+		if pet.hunger < self.feed_below:
+			engine.feed()
+		if pet.happiness < self.play_below and engine.allowed('start_play'):
+			engine.start_play()
+			engine.play(random.random() < self.win_rate)
+		if pet.health < self.sleep_below:
+			engine.sleep()
+
+
+#The strategies Balance.py plays by default.
+STRATEGIES = [
+	Strategy('careful', feed_below=80, play_below=80, win_rate=0.8, sleep_below=50),
+	Strategy('average'),
+	Strategy('bad at games', win_rate=0.1),
+	Strategy('slow medicine', medicine_delay=200),
+	Strategy('rarely there', period=150),
+	Strategy('neglectful', feed_below=0, play_below=0, medicine_delay=10 ** 9, sleep_below=0),
+]
+
+
+def lifetime(strategy, seed, limit=10 ** 6):
+	"""
+	Plays one life of a new pet with the strategy. The stats are averaged
+	over the checks.
+	"""
+	random = Random(seed)
+	engine = Engine.Engine(Pet())
+	engine.measured = False
+	pet = engine.pet
+	sick = 0
+	sick_for = 0
+	totals = [0, 0, 0]
+	checks = 0
+	while not pet.dead and engine.clock < limit:
+		#the sick clock counts every tick from the one it got sick on, so time sick is exact
+		sick_clock = engine.sick_clock if pet.sick else 0
+		engine.advance(strategy.period)
+		if pet.sick:
+			sick += engine.sick_clock - sick_clock
+		if pet.dead:
+			break
+		sick_for = sick_for + strategy.period if pet.sick else 0
+		checks += 1
+		for stat, value in enumerate(pet.stats.values):
+			totals[stat] += value
+		strategy.act(engine, sick_for, random)
+	life = {
+		'lifespan': engine.clock,
+		'old_age': pet.age > MAX_AGE,
+		'sick': sick,
+	}
+	for stat, name in enumerate(STATS):
+		life[name] = totals[stat] / checks if checks else 0
+	return life
+
+
+def distribution(values):
+	"""
+	The mean and percentiles of values.
+	"""
+	values = sorted(values)
+	percentile = lambda p: values[min(len(values) - 1, len(values) * p // 100)]
+	return {
+		'mean': statistics.mean(values),
+		'min': values[0],
+		'p10': percentile(10),
+		'median': percentile(50),
+		'p90': percentile(90),
+		'max': values[-1],
+	}
+
+
+def summary(lives):
+	return {
+		'lives': len(lives),
+		'old_age': sum(life['old_age'] for life in lives) / len(lives),
+		'lifespan': distribution([life['lifespan'] for life in lives]),
+		'sick_fraction': distribution([life['sick'] / life['lifespan'] if life['lifespan'] else 0 for life in lives]),
+		'stats': dict((name, distribution([life[name] for life in lives])) for name in STATS),
+	}
+
+
+def simulate(strategies=STRATEGIES, lives=1000, rules=None, workers=None, seed=0):
+	"""
+	Plays lives lifetimes with each strategy under the rules and returns
+	a summary of them by the strategy's name. The same seeds are used for
+	every strategy so they are compared on the same luck.
+	"""
+	results = {}
+	workers = workers or os.cpu_count()
+	#a few chunks a worker so they finish about together without sending every life on its own
+	chunksize = max(1, lives // (workers * 4))
+	with ProcessPoolExecutor(workers, initializer=set_rules, initargs=(rules or {},)) as pool:
+		for strategy in strategies:
+			seeds = range(seed, seed + lives)
+			results[strategy.name] = summary(list(pool.map(lifetime, [strategy] * lives, seeds, chunksize=chunksize)))
+	return results
+
+
+def scaling(strategy=STRATEGIES[1], lives=1000, workers=None):
+	"""
+	Times the same lifetimes with 1 up to workers processes (every core by default).
+	Returns the seconds taken and the speed up over one process for each.
+	"""
+	workers = workers or os.cpu_count()
+	times = {}
+	for count in range(1, workers + 1):
+		start = time.perf_counter()
+		simulate([strategy], lives, workers=count)
+		times[count] = time.perf_counter() - start
+	return dict((count, {'seconds': seconds, 'speed_up': times[1] / seconds}) for count, seconds in times.items())
+
+
+if __name__ == '__main__':
+	arguments = sys.argv[1:]
+	lives = int(arguments[0]) if arguments else 1000
+	workers = int(arguments[1]) if len(arguments) > 1 else None
+	output = arguments[2] if len(arguments) > 2 else 'balance.json'
+	start = time.perf_counter()
+	results = simulate(lives=lives, workers=workers)
+	report = {'seconds': time.perf_counter() - start, 'results': results}
+	with open(output, 'w') as file:
+		json.dump(report, file, indent=2)
+	for name, result in results.items():
+		print('%s: median lifespan %d ticks, %.0f%% lived to old age' % (name, result['lifespan']['median'], result['old_age'] * 100))
@@ -0,0 +1,296 @@
+"""
+Times the hot paths of the game without showing anything on screen
+and writes the results as JSON, so runs from different versions can
+be compared.
+
+python Benchmarks.py [results file] [largest saves folder]
+runs every benchmark, the saves folders go from 10 files up to the
+largest size in powers of 10 (100000 by default).
+"""
+import os, sys, json, time, asyncio, shutil, platform, statistics, subprocess, tempfile, tracemalloc
+from glob import glob
+
+#Headless sets Qt up to draw to memory, so it is imported first.
+from Headless import Host
+from PyQt5 import QtGui
+from PyQt5.QtWidgets import QApplication
+
+from Engine import Pet, Engine, TICK_LENGTH
+from Sprites import SpriteCache
+from Saves import SaveStore, encode, decode
+from Server import PetServer, Client
+
+
+def timed(function, repeat):
+	"""
+	Runs function repeat times and returns its timings in microseconds.
+	"""
+	times = []
+	for i in range(repeat):
+		start = time.perf_counter()
+		function()
+		times.append((time.perf_counter() - start) * 1e6)
+	return summary(times)
+
+
+def summary(times):
+	return {
+		'count': len(times),
+		'min_us': min(times),
+		'median_us': statistics.median(times),
+		'mean_us': statistics.mean(times),
+		'max_us': max(times),
+	}
+
+
+def tick_cost(host, ticks=20000):
+	"""
+	The cost of a tick on its own and through a Game window, which also
+	updates the bars, sprite and countdowns.
+	"""
+	engine = Engine(Pet())
+
+	def engine_tick():
+		if engine.pet.dead:
+			engine.pet.reset('', 100, 100, 100, 'Light Theme', 1)
+		engine.tick()
+
+	game = host.new_game()
+	game.show()
+
+	def game_tick():
+		if game.tamagotchi.dead:
+			game.tamagotchi.reset('Benchmark', 100, 100, 100, 'Light Theme', 1)
+		game.onTick(game.last_tick + 1)
+
+	results = {
+		'engine_tick': timed(engine_tick, ticks),
+		'game_tick': timed(game_tick, ticks),
+		'refresh_stats': timed(game.refresh_stats, ticks),
+		'render': timed(game.render, ticks),
+	}
+	game.hide()
+	return results
+
+
+def signal_latency(app, host, ticks=300, speed=10):
+	"""
+	How long after a tick's deadline the Update thread's signal is handled
+	on the GUI thread.
+	"""
+	update = host.update
+	latencies = []
+
+	def ticked(clock):
+		latencies.append((time.monotonic() - update.scheduler.deadline(clock)) * 1e6)
+		update.wake_at(clock + 1)
+
+	update.ticked.connect(ticked)
+	update.set_speed(speed)
+	update.start()
+	update.wake_at(1)
+	while len(latencies) < ticks:
+		app.processEvents()
+		time.sleep(0.0005)
+	update.stop()
+	update.ticked.disconnect(ticked)
+	return {'tick_length_s': TICK_LENGTH / speed, 'latency': summary(latencies)}
+
+
+def sprite_loads(repeat=20):
+	"""
+	Loading and scaling every Eggplant sprite, including decoding the first frame of the gifs.
+	"""
+	results = {}
+	for path in sorted(glob('./img/Eggplant/*')):
+		def load():
+			sprite = SpriteCache().load(path, 300)
+			if isinstance(sprite, QtGui.QMovie):
+				sprite.jumpToFrame(0)
+		results[os.path.basename(path)] = timed(load, repeat)
+	return results
+
+
+def theme_switches(host, repeat=20):
+	"""
+	Restyling the application with each theme while a Game window is showing.
+	"""
+	game = host.new_game()
+	game.show()
+	results = {}
+	for name in host.themes.names():
+		results[name] = timed(lambda: host.themes.apply(name, force=True), repeat)
+	game.hide()
+	return results
+
+
+def fill_folder(directory, count):
+	"""
+	Writes count saves straight to the folder, without the index.
+	"""
+	os.makedirs(directory, exist_ok=True)
+	for i in range(count):
+		name = 'Pet%06d' % i
+		with open(directory + name + '.TAMA', 'wb') as file:
+			file.write(encode((name, 100, 100, 100, 'Light Theme', 1, False, time.time())))
+
+
+def save_throughput(directory, count, batch=100):
+	"""
+	Opening a saves folder of count files, which builds its index, then
+	listing, loading and saving in it.
+	"""
+	folder = directory + '/saves%d/' % count
+	fill_folder(folder, count)
+
+	start = time.perf_counter()
+	store = SaveStore(folder)
+	opened = time.perf_counter() - start
+
+	start = time.perf_counter()
+	names = store.names()
+	listed = time.perf_counter() - start
+
+	sample = names[:batch]
+	start = time.perf_counter()
+	for name in sample:
+		store.load(name)
+	loaded = time.perf_counter() - start
+
+	pets = [Pet(name, 50, 50, 50) for name in sample]
+	start = time.perf_counter()
+	futures = [store.save(pet) for pet in pets]
+	for future in futures:
+		future.result()
+	saved = time.perf_counter() - start
+
+	store.close()
+	store.db.close()
+	shutil.rmtree(folder)
+	return {
+		'files': count,
+		'open_s': opened,
+		'names_s': listed,
+		'loads_per_s': len(sample) / loaded,
+		'saves_per_s': len(sample) / saved,
+	}
+
+
+def startup(repeat=5):
+	"""
+	How long from starting the game until the main menu is showing, each
+	run in a new process so nothing is already imported or loaded.
+	"""
+	times = []
+	#the game runs in an empty folder so its saves and journal are not left beside the code
+	with tempfile.TemporaryDirectory() as directory:
+		for folder in ('img', 'styles'):
+			try:
+				os.symlink(os.path.abspath(folder), os.path.join(directory, folder))
+			except OSError:
+				shutil.copytree(folder, os.path.join(directory, folder))
+		for i in range(repeat):
+			start = time.perf_counter()
+			game = subprocess.Popen([sys.executable, os.path.abspath('Main file.py'), '--startup'], stdout=subprocess.PIPE, cwd=directory)
+			game.stdout.readline()
+			times.append((time.perf_counter() - start) * 1e6)
+			game.wait()
+	return summary(times)
+
+
+def server_capacity(directory, pets=5000, seconds=3.0, requests=5000):
+	"""
+	How many pets the asyncio server could keep running in real time on
+	one core, from the ticks it runs per second of CPU time, and the round
+	trip of requests over a unix socket while it is running them.
+	"""
+	async def measure():
+		server = PetServer()
+		await server.listen(directory + '/server.sock')
+		names = ['Pet%06d' % i for i in range(pets)]
+		for name in names:
+			server.open(name)
+
+		cpu = time.process_time()
+		await asyncio.sleep(seconds)
+		cpu = time.process_time() - cpu
+		ticks = sum(hosted.engine.clock for hosted in server.pets.values())
+
+		client = await Client.connect(directory + '/server.sock')
+		times = []
+		for i in range(requests):
+			start = time.perf_counter()
+			await client.request('feed', names[i % pets])
+			times.append((time.perf_counter() - start) * 1e6)
+		await client.close()
+		await server.shutdown(save=False)
+		return {
+			'pets': pets,
+			'cpu_s': cpu,
+			'ticks_per_cpu_s': ticks / cpu,
+			'pets_per_core': ticks / cpu * TICK_LENGTH,
+			'request': summary(times),
+		}
+
+	return asyncio.run(measure())
+
+
+def pet_memory(count=100000):
+	"""
+	The bytes each pet takes, loaded from a save so its strings are made
+	the way a game makes them, and with the Engine that runs it.
+	"""
+	saves = [encode(('Pet%06d' % i, 100, 100, 100, 'Light Theme', 1, False, time.time())) for i in range(count)]
+	tracemalloc.start()
+	start = tracemalloc.get_traced_memory()[0]
+	pets = []
+	for data in saves:
+		contents = decode(data)
+		pets.append(Pet(*contents[:6]))
+	pet = tracemalloc.get_traced_memory()[0] - start
+	engines = [Engine(pet) for pet in pets]
+	engine = tracemalloc.get_traced_memory()[0] - start - pet
+	tracemalloc.stop()
+	return {'pets': count, 'pet_bytes': pet / count, 'engine_bytes': engine / count}
+
+
+def run(output='benchmarks.json', largest=100000):
+	app = QApplication.instance() or QApplication(sys.argv)
+	directory = tempfile.mkdtemp()
+	try:
+		host = Host(directory)
+		results = {
+			'startup': startup(),
+			'pet_memory': pet_memory(),
+			'ticks': tick_cost(host),
+			'signal_latency': signal_latency(app, host),
+			'sprite_loads': sprite_loads(),
+			'theme_switches': theme_switches(host),
+			'server': server_capacity(directory),
+			'saves': [],
+		}
+		count = 10
+		while count <= largest:
+			results['saves'].append(save_throughput(directory, count))
+			count *= 10
+		host.saves.close()
+	finally:
+		shutil.rmtree(directory)
+
+	report = {
+		'time': time.strftime('%Y-%m-%dT%H:%M:%S'),
+		'python': platform.python_version(),
+		'platform': platform.platform(),
+		'results': results,
+	}
+	with open(output, 'w') as file:
+		json.dump(report, file, indent=2)
+	return report
+
+
+if __name__ == '__main__':
+	arguments = sys.argv[1:]
+	if len(arguments) > 1:
+		arguments[1] = int(arguments[1])
+	report = run(*arguments)
+	print(json.dumps(report['results']['ticks'], indent=2))
@@ -0,0 +1,626 @@
+"""
+The rules of the tamagotchi game, kept apart from the PyQt windows
+so that a pet can be simulated without a QApplication.
+"""
+import sys
+
+from Metrics import metrics
+
+#Length of one tick of the Update thread in seconds.
+TICK_LENGTH = 0.1
+
+#The stats of a tamagotchi, their index is the integer used in the schedules.
+STATS = ['health', 'hunger', 'happiness']
+HEALTH, HUNGER, HAPPINESS = 0, 1, 2
+
+#The other integers emitted by the Update thread.
+AGE = 3
+DISCIPLINE = 5
+CLEANING = 6
+
+#(period in ticks, integer emitted) in the order the Update thread checks them.
+UPDATE_SCHEDULE = [(2, HUNGER), (3, HAPPINESS), (5, HEALTH), (200, DISCIPLINE), (250, CLEANING), (600, AGE)]
+PERIODS = dict((value, period) for period, value in UPDATE_SCHEDULE)
+
+#What Engine.projection counts down to.
+PROJECTED = ['hungry', 'unhappy', 'sick', 'dead', 'aged', 'discipline', 'cleaning']
+
+#Sleeping restores stats for 50 ticks and then the tamagotchi wakes up.
+SLEEP_LENGTH = 50
+SLEEP_SCHEDULE = [(10, HAPPINESS), (5, HEALTH)]
+WAKE = 3
+
+#A sick tamagotchi loses SICK_HEALTH health and SICK_HAPPINESS happiness every
+#SICK_PERIOD ticks until it is given medicine, on_sick is run with SICK_TICK then.
+SICK_PERIOD = 10
+SICK_TICK = 1
+
+MAX_STAT = 100
+MAX_AGE = 3
+
+#How much each action or schedule changes the stats by.
+DECAY = -1
+FEED_AMOUNT = 10
+GAME_AMOUNT = 50
+MEDICINE_AMOUNT = 20
+SLEEP_AMOUNTS = {HEALTH: 5, HAPPINESS: 1}
+SICK_HEALTH = -5
+SICK_HAPPINESS = -3
+
+
+def ticks_between(clock, ticks, period):
+	"""
+	Returns how many multiples of period there are in the ticks after clock.
+	"""
+	return (clock + ticks) // period - clock // period
+
+
+def next_multiple(clock, period, count=1):
+	"""
+	Returns how many ticks after clock the count-th multiple of period comes.
+	"""
+	return (clock // period + count) * period - clock
+
+
+class Stats():
+	"""
+	The health, hunger and happiness of a pet as integers between 0 and 100,
+	stored a byte each by their index in STATS.
+	Every listener is called with (stat, value) when a stat changes.
+	"""
+	__slots__ = ('values', 'listeners')
+
+	def __init__(self, health=MAX_STAT, hunger=MAX_STAT, happiness=MAX_STAT):
+		self.values = bytearray((int(health), int(hunger), int(happiness)))
+		#most pets have no window listening, so they share the empty tuple
+		self.listeners = ()
+
+	def listen(self, listener):
+		self.listeners += (listener,)
+
+	def set(self, stat, value):
+		if value > MAX_STAT:
+			value = MAX_STAT
+		elif value < 0:
+			value = 0
+		if value != self.values[stat]:
+			self.values[stat] = value
+			for listener in self.listeners:
+				listener(stat, value)
+
+	def change(self, stat, amount):
+		self.set(stat, self.values[stat] + amount)
+
+
+class Pet():
+	"""
+	Holds all of the information about a tamagotchi.
+	It has slots instead of a __dict__ so that thousands of pets stay
+	small, Benchmarks.pet_memory measures how small.
+	"""
+	__slots__ = ('name', 'stats', 'style_name', 'species', 'age', 'sick', 'dead', 'sleeping',
+		'needs_discipline', 'needs_cleaning', 'playing_with_pet')
+
+	def __init__(self, name='', health=MAX_STAT, hunger=MAX_STAT, happiness=MAX_STAT, style_name='Light Theme', age=1):
+		self.playing_with_pet = False
+		#the only species there are sprites for
+		self.species = 'Eggplant'
+		self.stats = Stats()
+		self.reset(name, health, hunger, happiness, style_name, age)
+
+	#The stats can be read and set by name, setting them goes through Stats.set.
+	health = property(lambda self: self.stats.values[HEALTH], lambda self, value: self.stats.set(HEALTH, int(value)))
+	hunger = property(lambda self: self.stats.values[HUNGER], lambda self, value: self.stats.set(HUNGER, int(value)))
+	happiness = property(lambda self: self.stats.values[HAPPINESS], lambda self, value: self.stats.set(HAPPINESS, int(value)))
+
+	def reset(self, name, health, hunger, happiness, style_name, age):
+		"""
+		Sets all of the stats and clears the states left over from an older game.
+		"""
+		self.name = name
+		self.health = health
+		self.hunger = hunger
+		self.happiness = happiness
+		#every pet with the same style shares one string
+		self.style_name = sys.intern(style_name)
+		self.age = int(age)
+
+		self.sick = False
+		self.dead = False
+		self.sleeping = False
+		self.needs_discipline = False
+		self.needs_cleaning = False
+
+
+class Engine():
+	"""
+	Applies the game rules to a Pet.
+
+	tick runs the update, sleeping and sick schedules from the engine's
+	own clocks, so a pet can be driven by the Update thread or simulated
+	as fast as python allows.
+
+	Every method returns a list of the events that happened so a window
+	can show them: 'sick', 'cured', 'asleep', 'awake', 'aged', 'dead',
+	'discipline' and 'cleaning'.
+	"""
+	__slots__ = ('pet', 'clock', 'sleep_clock', 'sick_clock', 'journal', 'measured')
+
+	def __init__(self, pet):
+		self.pet = pet
+		self.clock = 0
+		self.sleep_clock = 0
+		self.sick_clock = 0
+		#a Journal that records the ticks and actions that go into the engine
+		self.journal = None
+		#copies used for working things out are left out of the metrics
+		self.measured = True
+
+	def record(self, action, amount=0):
+		if self.journal is not None:
+			self.journal.record(action, amount)
+
+	def change_stat(self, stat, amount):
+		"""
+		Changes a stat by the amount, keeping it between 0 and 100.
+		"""
+		self.pet.stats.change(stat, amount)
+
+	def on_updates(self, values):
+		"""
+		Applies every integer the Update thread emitted on one tick.
+		All of the stats are changed first so sickness and death are
+		only checked once, then the other integers run in order.
+		"""
+		pet = self.pet
+		events = []
+		if pet.playing_with_pet or pet.dead:
+			return events
+
+		stats = pet.stats
+		decayed = False
+		for value in values:
+			if value < 3:
+				stats.change(value, DECAY)
+				decayed = True
+		if decayed:
+			if stats.values[HUNGER] <= 0 or stats.values[HAPPINESS] <= 0:
+				events += self.getting_sick()
+			if stats.values[HEALTH] <= 0:
+				events += self.die()
+
+		for value in values:
+			if pet.dead:
+				break
+
+			#if the age of the tamagotchi is above 3 so it has aged past old age it dies
+			if value == AGE:
+				pet.age += 1
+				if pet.age > MAX_AGE:
+					events += self.die()
+				else:
+					events.append('aged')
+
+			elif value == DISCIPLINE and not pet.sick:
+				pet.needs_discipline = True
+				events.append('discipline')
+
+			elif value == CLEANING and not pet.sick and not pet.sleeping:
+				pet.needs_cleaning = True
+				events.append('cleaning')
+
+		return events
+
+	def due(self, clock):
+		"""
+		Returns the integers the Update thread emits on a tick.
+		"""
+		return [value for period, value in UPDATE_SCHEDULE if not clock % period]
+
+	def on_sleep(self, value):
+		"""
+		Restores health and happiness while sleeping and wakes the pet up.
+		"""
+		if self.pet.dead:
+			return []
+		if value == WAKE:
+			self.pet.sleeping = False
+			return ['awake']
+		self.change_stat(value, SLEEP_AMOUNTS[value])
+		return []
+
+	def on_sick(self, value):
+		"""
+		Damages the pet while it is sick.
+		"""
+		pet = self.pet
+		if pet.dead:
+			return []
+		if value == SICK_TICK and pet.sick:
+			self.change_stat(HEALTH, SICK_HEALTH)
+			self.change_stat(HAPPINESS, SICK_HAPPINESS)
+			if pet.health <= 0:
+				return self.die()
+		return []
+
+	def getting_sick(self):
+		"""
+		the tamagotchi doesnt get sick till it wakes up
+		"""
+		pet = self.pet
+		if pet.sleeping or pet.sick:
+			return []
+		pet.sick = True
+		self.sick_clock = 0
+		return ['sick']
+
+	def die(self):
+		if self.pet.dead:
+			return []
+		self.pet.dead = True
+		return ['dead']
+
+	def tick(self):
+		"""
+		Advances the pet by one tick, running everything that is due on it.
+		"""
+		self.clock += 1
+		return self.step(self.due(self.clock))
+
+	def step(self, values):
+		"""
+		Applies the integers due on this tick and advances
+		the sleeping and sick schedules by one tick.
+		"""
+		events = self.on_updates(values)
+		if metrics.enabled and self.measured:
+			metrics.count('ticks')
+			for value in values:
+				metrics.count('update %d' % value)
+
+		if self.pet.sleeping:
+			self.sleep_clock += 1
+			for period, value in SLEEP_SCHEDULE:
+				if not self.sleep_clock % period:
+					events += self.on_sleep(value)
+					if metrics.enabled and self.measured:
+						metrics.count('sleeping %d' % value)
+			if self.sleep_clock >= SLEEP_LENGTH:
+				events += self.on_sleep(WAKE)
+				if metrics.enabled and self.measured:
+					metrics.count('sleeping %d' % WAKE)
+
+		#a sick pet is damaged as soon as it gets sick and then every second
+		if self.pet.sick:
+			if not self.sick_clock % SICK_PERIOD:
+				events += self.on_sick(SICK_TICK)
+				if metrics.enabled and self.measured:
+					metrics.count('sick %d' % SICK_TICK)
+			self.sick_clock += 1
+
+		return events
+
+	def run(self, ticks=None):
+		"""
+		Runs the pet without any delay until it dies or the ticks run out.
+		Returns the number of ticks that were run.
+		"""
+		count = 0
+		while not self.pet.dead and (ticks is None or count < ticks):
+			self.tick()
+			count += 1
+		return count
+
+	def sickness(self):
+		"""
+		Returns how many ticks from now the first stat decays, the pet
+		gets sick and it is first damaged by being sick, if it stays
+		awake and nothing is done for it.
+		"""
+		pet = self.pet
+		clock = self.clock
+		#sickness and death are only checked on the ticks a stat decays
+		first_decay = min(next_multiple(clock, period) for period, value in UPDATE_SCHEDULE if value < 3)
+		if pet.sick:
+			return first_decay, 0, -self.sick_clock % SICK_PERIOD + 1
+		hunger, happiness = pet.hunger, pet.happiness
+		sick_at = min(next_multiple(clock, PERIODS[HUNGER], hunger) if hunger else first_decay,
+			next_multiple(clock, PERIODS[HAPPINESS], happiness) if happiness else first_decay)
+		return first_decay, sick_at, sick_at
+
+	def runs_out(self, value, period, amount, first_decay, first_damage):
+		"""
+		Returns how many ticks until a stat at value that decays every
+		period ticks, and changes by amount when the pet is damaged by
+		being sick, reaches 0.
+		"""
+		clock = self.clock
+		if value <= 0:
+			return min(first_decay, first_damage)
+
+		def lost(ticks):
+			damaged = 0 if ticks < first_damage else (ticks - first_damage) // SICK_PERIOD + 1
+			return ticks_between(clock, ticks, period) - damaged * amount
+
+		ticks = next_multiple(clock, period, value)
+		if ticks >= first_damage:
+			#lower bound from the average rate of loss, then walk the few ticks up to it
+			rate = 1 / period - amount / SICK_PERIOD
+			lowest = (value - 1 + amount - amount * first_damage / SICK_PERIOD) / rate
+			ticks = max(first_damage, int(lowest) - 1)
+			while lost(ticks) < value:
+				ticks += 1
+		return ticks
+
+	def catch_up(self, ticks):
+		"""
+		Works out where the pet will be after the ticks without running them,
+		so catching up on any amount of time costs the same.
+		The pet is assumed not to be playing, and the rest of a sleep is run
+		tick by tick first since it is at most SLEEP_LENGTH ticks.
+		Returns the events that happened along the way.
+		"""
+		pet = self.pet
+		if pet.dead or ticks <= 0:
+			return []
+		#it ends up where advance would, so that is how it is replayed
+		self.record('advance', ticks)
+		events = []
+		while pet.sleeping and not pet.dead and ticks > 0:
+			events += self.tick()
+			ticks -= 1
+		if pet.dead or ticks <= 0:
+			return events
+		clock = self.clock
+		health, hunger, happiness = pet.stats.values
+
+		first_decay, sick_at, first_damage = self.sickness()
+
+		def damage(ticks):
+			#how many times it has been damaged by sickness after the ticks
+			return 0 if ticks < first_damage else (ticks - first_damage) // SICK_PERIOD + 1
+
+		dies_at = self.runs_out(health, PERIODS[HEALTH], SICK_HEALTH, first_decay, first_damage)
+
+		#when it ages past old age
+		old_at = next_multiple(clock, PERIODS[AGE], MAX_AGE + 1 - pet.age)
+		died = min(dies_at, old_at) <= ticks
+		end = min(ticks, dies_at, old_at)
+
+		#on the tick it dies, whatever comes after the cause of death doesn't happen
+		decays = any(not (clock + end) % period for period, value in UPDATE_SCHEDULE if value < 3)
+		decay_killed = died and dies_at <= old_at and decays and \
+			health - ticks_between(clock, end, PERIODS[HEALTH]) + damage(end - 1) * SICK_HEALTH <= 0
+		damage_killed = died and dies_at < old_at and not decay_killed
+		damaged = damage(end) if not died or damage_killed else damage(end - 1)
+
+		pet.hunger = hunger - ticks_between(clock, end, PERIODS[HUNGER])
+		pet.happiness = happiness - ticks_between(clock, end, PERIODS[HAPPINESS]) + damaged * SICK_HAPPINESS
+		pet.health = health - ticks_between(clock, end, PERIODS[HEALTH]) + damaged * SICK_HEALTH
+		aged = ticks_between(clock, end - 1 if decay_killed else end, PERIODS[AGE])
+		pet.age += aged
+		if aged and pet.age <= MAX_AGE:
+			events.append('aged')
+
+		#discipline and cleaning are only asked for before it is sick or dead
+		for value, needs, event in ((DISCIPLINE, 'needs_discipline', 'discipline'), (CLEANING, 'needs_cleaning', 'cleaning')):
+			asked_at = next_multiple(clock, PERIODS[value])
+			if asked_at <= end and asked_at < sick_at and not (decay_killed and asked_at == end):
+				setattr(pet, needs, True)
+				events.append(event)
+
+		if not pet.sick and sick_at <= end:
+			pet.sick = True
+			events.append('sick')
+			#the sick clock starts again from the tick it got sick on
+			self.sick_clock = end - sick_at + 1
+		elif pet.sick:
+			self.sick_clock += end
+		self.clock += end
+		if died:
+			events += self.die()
+		return events
+
+	def projection(self):
+		"""
+		Returns how many ticks until each thing happens to the pet if
+		nothing is done for it: 'hungry' and 'unhappy' when hunger and
+		happiness reach 0, 'sick', 'dead', 'aged', 'discipline' and 'cleaning'.
+		Things that won't happen before it dies are left out.
+		A pet that is playing is projected from when it stops.
+		"""
+		pet = self.pet
+		if pet.dead:
+			return {}
+		if pet.sleeping:
+			return self.projection_after_sleep()
+
+		first_decay, sick_at, first_damage = self.sickness()
+		dead = min(self.runs_out(pet.health, PERIODS[HEALTH], SICK_HEALTH, first_decay, first_damage),
+			next_multiple(self.clock, PERIODS[AGE], MAX_AGE + 1 - pet.age))
+		projection = {
+			'hungry': next_multiple(self.clock, PERIODS[HUNGER], pet.hunger) if pet.hunger else 0,
+			'unhappy': self.runs_out(pet.happiness, PERIODS[HAPPINESS], SICK_HAPPINESS, first_decay, first_damage) if pet.happiness else 0,
+			'dead': dead,
+		}
+		if not pet.sick:
+			projection['sick'] = sick_at
+		if pet.age < MAX_AGE:
+			projection['aged'] = next_multiple(self.clock, PERIODS[AGE])
+		#discipline and cleaning are only asked for before it is sick
+		for value, event in ((DISCIPLINE, 'discipline'), (CLEANING, 'cleaning')):
+			asked_at = next_multiple(self.clock, PERIODS[value])
+			if asked_at < sick_at:
+				projection[event] = asked_at
+		return self.before_death(projection)
+
+	def projection_after_sleep(self):
+		"""
+		Runs the rest of the sleep on a copy of the pet, which is at most
+		SLEEP_LENGTH ticks, and projects the rest from when it wakes up.
+		"""
+		pet = self.pet
+		copy = Engine(Pet(pet.name, pet.health, pet.hunger, pet.happiness, pet.style_name, pet.age))
+		for state in ('sick', 'sleeping', 'needs_discipline', 'needs_cleaning'):
+			setattr(copy.pet, state, getattr(pet, state))
+		copy.clock, copy.sleep_clock, copy.sick_clock = self.clock, self.sleep_clock, self.sick_clock
+		copy.measured = False
+
+		projection = {}
+		ticks = 0
+		if pet.hunger <= 0:
+			projection['hungry'] = 0
+		if pet.happiness <= 0:
+			projection['unhappy'] = 0
+		while copy.pet.sleeping and not copy.pet.dead:
+			ticks += 1
+			for event in copy.tick():
+				projection.setdefault(event, ticks)
+			if copy.pet.hunger <= 0:
+				projection.setdefault('hungry', ticks)
+			if copy.pet.happiness <= 0:
+				projection.setdefault('unhappy', ticks)
+		for event, after in copy.projection().items():
+			projection.setdefault(event, ticks + after)
+		return self.before_death(projection)
+
+	def before_death(self, projection):
+		#things on the tick it dies don't count, which of them happen first depends on the cause of death
+		dead = projection['dead']
+		return dict((event, ticks) for event, ticks in projection.items() if event in PROJECTED and ticks < dead or event == 'dead')
+
+	def next_tick(self):
+		"""
+		Returns how many ticks until the next tick that changes anything,
+		or None if nothing will change until something is done for the pet.
+		"""
+		pet = self.pet
+		if pet.dead:
+			return None
+		ticks = []
+		if not pet.playing_with_pet:
+			ticks += [next_multiple(self.clock, period) for period, value in UPDATE_SCHEDULE]
+		if pet.sleeping:
+			ticks += [next_multiple(self.sleep_clock, period) for period, value in SLEEP_SCHEDULE]
+			ticks.append(max(SLEEP_LENGTH - self.sleep_clock, 1))
+		if pet.sick:
+			ticks.append(-self.sick_clock % SICK_PERIOD + 1)
+		return min(ticks) if ticks else None
+
+	def skip(self, ticks):
+		"""
+		Moves the clocks past ticks on which nothing happens.
+		"""
+		if metrics.enabled and ticks:
+			metrics.count('ticks skipped', ticks)
+		self.clock += ticks
+		if self.pet.sleeping:
+			self.sleep_clock += ticks
+		if self.pet.sick:
+			self.sick_clock += ticks
+
+	def advance(self, ticks):
+		"""
+		Runs the ticks, skipping straight past the ones where nothing happens.
+		"""
+		if ticks > 0:
+			self.record('advance', ticks)
+		events = []
+		while ticks > 0 and not self.pet.dead:
+			idle = self.next_tick()
+			idle = ticks if idle is None else min(idle - 1, ticks)
+			self.skip(idle)
+			ticks -= idle
+			if ticks:
+				events += self.tick()
+				ticks -= 1
+		return events
+
+	#Actions the user can take
+	def allowed(self, action):
+		"""
+		Whether the action can be taken now, the same rules as the Game
+		window's buttons: while the pet asks to be cleaned or disciplined
+		that comes first, a sleeping pet can only be woken, a sick pet can
+		have medicine but can't sleep or play, and play only finishes a
+		game that was started.
+		"""
+		pet = self.pet
+		if pet.dead:
+			return False
+		if action in ('clean', 'discipline'):
+			return True
+		if action == 'wake':
+			return pet.sleeping
+		if action == 'play':
+			return pet.playing_with_pet
+		if pet.sleeping or pet.playing_with_pet:
+			return False
+		if action == 'medicine':
+			return pet.sick
+		if pet.needs_discipline or pet.needs_cleaning:
+			return False
+		return action == 'feed' or not pet.sick
+
+	def feed(self):
+		self.record('feed')
+		if self.allowed('feed'):
+			self.change_stat(HUNGER, FEED_AMOUNT)
+		return []
+
+	def medicine(self):
+		"""
+		Cures the pet and gives it some hunger and happiness.
+		"""
+		self.record('medicine')
+		if not self.allowed('medicine'):
+			return []
+		self.pet.sick = False
+		self.change_stat(HUNGER, MEDICINE_AMOUNT)
+		self.change_stat(HAPPINESS, MEDICINE_AMOUNT)
+		return ['cured']
+
+	def sleep(self):
+		self.record('sleep')
+		if not self.allowed('sleep'):
+			return []
+		self.pet.sleeping = True
+		self.sleep_clock = 0
+		return ['asleep']
+
+	def wake(self):
+		self.record('wake')
+		if not self.allowed('wake'):
+			return []
+		self.pet.sleeping = False
+		return ['awake']
+
+	def start_play(self):
+		"""
+		Stops the stats from changing while the happiness game is open.
+		"""
+		self.record('start_play')
+		if self.allowed('start_play'):
+			self.pet.playing_with_pet = True
+		return []
+
+	def play(self, won):
+		self.record('play', int(won))
+		if not self.allowed('play'):
+			return []
+		self.pet.playing_with_pet = False
+		if won:
+			self.change_stat(HAPPINESS, GAME_AMOUNT)
+		return []
+
+	def clean(self):
+		self.record('clean')
+		if self.allowed('clean'):
+			self.pet.needs_cleaning = False
+		return []
+
+	def discipline(self):
+		self.record('discipline')
+		if self.allowed('discipline'):
+			self.pet.needs_discipline = False
+		return []
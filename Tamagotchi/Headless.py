@@ -0,0 +1,66 @@
+"""
+The parts of the game that run the real windows without showing
+anything on screen, for Benchmarks and Replay.
+"""
+import os
+from random import Random
+
+#Qt draws to memory instead of a screen.
+os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+
+from Engine import Pet
+from Sprites import SpriteCache
+from Themes import ThemeRegistry
+from Saves import SaveStore
+from Journal import JournalStore
+from Threads import Update
+from Windows import Game
+
+
+class Host():
+	"""
+	Stands in for AppWindow, holding the shared parts a Game window uses
+	without starting the clock or showing the main menu.
+	"""
+	def __init__(self, directory):
+		self.sprites = SpriteCache()
+		self.themes = ThemeRegistry()
+		self.saves = SaveStore(directory + '/saves/')
+		self.journals = JournalStore(directory + '/journal/')
+		self.update = Update(self)
+		self.frames = {}
+		self.games = []
+		self.random = Random(0)
+
+	def window(self, window):
+		if window not in self.frames:
+			self.frames[window] = window(self)
+		return self.frames[window]
+
+	def user_action(self, game, action, argument=None):
+		pass
+
+	def remove_game(self, game):
+		pass
+
+	def sync(self):
+		pass
+
+	def reschedule(self):
+		pass
+
+	def set_speed(self, speed):
+		pass
+
+	def step(self):
+		pass
+
+	def set_metrics(self, enabled):
+		pass
+
+	def new_game(self):
+		pet = Pet('Benchmark')
+		pet.species = 'Eggplant'
+		game = Game(self, pet)
+		game.init_stats()
+		return game
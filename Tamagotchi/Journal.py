@@ -0,0 +1,227 @@
+"""
+Keeps a journal of everything that happens to each running tamagotchi,
+so a crash loses at most the last flush instead of everything since the
+last save.
+
+The engine is deterministic, so the journal records what goes into it,
+the ticks it is advanced by and the actions the user takes, rather than
+every stat change. A journal file is a snapshot of the pet and its
+engine followed by the records since:
+	snapshot: 255, then the SNAPSHOT struct, the name and the style in utf-8
+	record: the index of the action in ACTIONS and an amount (RECORD struct)
+Replaying the records on the snapshot gives back the pet, stats, events
+and all.
+"""
+import os, struct
+from glob import glob
+
+from Metrics import metrics
+
+ACTIONS = ['advance', 'feed', 'medicine', 'sleep', 'wake', 'start_play', 'play', 'clean', 'discipline']
+ADVANCE = 0
+SNAPSHOT_CODE = 255
+RECORD = struct.Struct('<BI')
+#health, hunger, happiness, age, flags, clock, sleep clock, sick clock, name length, style length
+SNAPSHOT = struct.Struct('<BBBBBIIIHB')
+FLAGS = ['sick', 'dead', 'sleeping', 'playing_with_pet', 'needs_discipline', 'needs_cleaning']
+
+#Records written before a snapshot replaces them.
+SNAPSHOT_EVERY = 500
+
+
+def encode_snapshot(engine):
+	pet = engine.pet
+	name = pet.name.encode('utf-8')
+	style = pet.style_name.encode('utf-8')
+	flags = sum(1 << bit for bit, flag in enumerate(FLAGS) if getattr(pet, flag))
+	return bytes([SNAPSHOT_CODE]) + SNAPSHOT.pack(pet.health, pet.hunger, pet.happiness, pet.age, flags,
+		engine.clock, engine.sleep_clock, engine.sick_clock, len(name), len(style)) + name + style
+
+
+def decode(data):
+	"""
+	Returns the last snapshot in a journal and the records after it.
+	A record cut short by a crash is left out.
+	"""
+	snapshot = None
+	records = []
+	offset = 0
+	while offset < len(data):
+		if data[offset] == SNAPSHOT_CODE:
+			start = offset + 1
+			if start + SNAPSHOT.size > len(data):
+				break
+			fields = SNAPSHOT.unpack_from(data, start)
+			end = start + SNAPSHOT.size + fields[-2] + fields[-1]
+			if end > len(data):
+				break
+			body = data[start + SNAPSHOT.size:end]
+			snapshot = fields[:-2] + (body[:fields[-2]].decode('utf-8'), body[fields[-2]:].decode('utf-8'))
+			records = []
+			offset = end
+		else:
+			if offset + RECORD.size > len(data):
+				break
+			code, amount = RECORD.unpack_from(data, offset)
+			if code >= len(ACTIONS):
+				raise ValueError('journal has an unknown record')
+			records.append((ACTIONS[code], amount))
+			offset += RECORD.size
+	if snapshot is None:
+		raise ValueError('journal has no snapshot')
+	return snapshot, records
+
+
+def replay(engine, snapshot, records):
+	"""
+	Sets the engine and its pet to the snapshot and runs the records on them.
+	"""
+	health, hunger, happiness, age, flags, clock, sleep_clock, sick_clock, name, style = snapshot
+	pet = engine.pet
+	pet.reset(name, health, hunger, happiness, style, age)
+	for bit, flag in enumerate(FLAGS):
+		setattr(pet, flag, bool(flags & 1 << bit))
+	engine.clock, engine.sleep_clock, engine.sick_clock = clock, sleep_clock, sick_clock
+	for action, amount in records:
+		if action == 'advance':
+			engine.advance(amount)
+		elif action == 'play':
+			engine.play(bool(amount))
+		else:
+			getattr(engine, action)()
+
+
+class Journal():
+	"""
+	The journal of one running tamagotchi.
+	Records are kept in memory and written in batches by flush, and
+	advances in a row are joined into one record.
+	"""
+	def __init__(self, path, engine):
+		self.path = path
+		self.engine = engine
+		self.buffer = [] #[action index, amount]
+		self.written = 0 #records in the file after its snapshot
+		self.file = None
+		self.snapshot()
+		engine.journal = self
+
+	def record(self, action, amount=0):
+		code = ACTIONS.index(action)
+		if code == ADVANCE and self.buffer and self.buffer[-1][0] == ADVANCE:
+			self.buffer[-1][1] += amount
+		else:
+			self.buffer.append([code, amount])
+
+	def flush(self):
+		"""
+		Writes the records that are waiting, or a new snapshot in place of
+		the whole file once enough records have built up.
+		"""
+		buffer, self.buffer = self.buffer, []
+		if not buffer:
+			return
+		if self.written + len(buffer) >= SNAPSHOT_EVERY:
+			self.snapshot()
+			return
+		start = metrics.start()
+		self.file.write(b''.join(RECORD.pack(code, amount) for code, amount in buffer))
+		self.file.flush()
+		self.written += len(buffer)
+		metrics.stop('journal flush', start)
+
+	def snapshot(self):
+		"""
+		Replaces the journal with a snapshot of the engine as it is now.
+		"""
+		start = metrics.start()
+		if self.file is not None:
+			self.file.close()
+		temp = self.path + '.tmp'
+		with open(temp, 'wb') as file:
+			file.write(encode_snapshot(self.engine))
+			file.flush()
+			os.fsync(file.fileno())
+		os.replace(temp, self.path)
+		#the snapshot already has everything that was waiting
+		self.buffer = []
+		self.written = 0
+		self.file = open(self.path, 'ab')
+		metrics.stop('journal snapshot', start)
+
+	def close(self, delete=False):
+		self.engine.journal = None
+		if delete:
+			self.file.close()
+			os.remove(self.path)
+		else:
+			self.flush()
+			self.file.close()
+
+
+class JournalStore():
+	"""
+	Keeps a journal for every running tamagotchi in the journal folder,
+	apart from the saves folder so the save index is not rebuilt when
+	the journals change.
+	The folder is only read when the store is made, after that the
+	names of the journals in it are kept up to date here.
+	"""
+	def __init__(self, directory='./journal/'):
+		os.makedirs(directory, exist_ok=True)
+		self.directory = directory
+		self.journals = {} #the open journals by name
+		self.files = set(os.path.basename(path)[:-8] for path in glob(self.directory + '*.journal'))
+
+	def path(self, name):
+		return self.directory + name + '.journal'
+
+	def names(self):
+		return sorted(self.files)
+
+	def contains(self, name):
+		return name in self.files
+
+	def modified(self, name):
+		return os.stat(self.path(name)).st_mtime
+
+	def restore(self, name, engine):
+		"""
+		Sets the engine to where its journal got to, raises ValueError if the journal is damaged.
+		"""
+		if name in self.journals:
+			self.journals[name].flush()
+		with open(self.path(name), 'rb') as file:
+			snapshot, records = decode(file.read())
+		replay(engine, snapshot, records)
+
+	def open(self, engine):
+		"""
+		Starts a journal for the engine's pet, replacing any old one.
+		"""
+		name = engine.pet.name
+		if name in self.journals:
+			self.journals.pop(name).close()
+		journal = self.journals[name] = Journal(self.path(name), engine)
+		self.files.add(name)
+		return journal
+
+	def delete(self, name):
+		if name in self.journals:
+			self.journals.pop(name).close(delete=True)
+		elif self.contains(name):
+			os.remove(self.path(name))
+		self.files.discard(name)
+
+	def flush(self):
+		for journal in self.journals.values():
+			journal.flush()
+
+	def close(self, name=None):
+		"""
+		Writes what is waiting and stops journaling the pet, or every pet.
+		The journals are kept so the pets can carry on from them.
+		"""
+		for name in [name] if name is not None else list(self.journals):
+			if name in self.journals:
+				self.journals.pop(name).close()
@@ -2,12 +2,21 @@
 #pip install PyQt5-tools is the command to install it.
 #Project was created in sublime text  + visual studio code in  Python version 3.7
 
-from PyQt5.QtWidgets import * #Used to import all of the widgets such as buttons, labels etc.
+from PyQt5.QtWidgets import QApplication
+from PyQt5 import QtCore
 import sys, time #Sys used with the pyqt5 library and time is used in the threading modules.
+import random
 
 #imports the other classes
-from Windows import MainMenu, Game, HappinessGame
-from Threads import Update, Sleeping, Sick
+from Windows import MainMenu, Game, SPEEDS, FRAME_RATE
+from Threads import Update
+from Engine import Pet, Engine, TICK_LENGTH
+from Sprites import SpriteCache
+from Themes import ThemeRegistry
+from Saves import SaveStore
+from Journal import JournalStore
+from Recording import Recorder
+from Metrics import metrics
 
 
 class AppWindow():
@@ -15,84 +24,282 @@ class AppWindow():
 	Manages the other screens and threads
 	run all of the __init__ methods of classes
 	"""
-	def __init__(self):
+	def __init__(self, seed=None, recording=None, frame_rate=FRAME_RATE):
 
-		tamagotchi = Tamagotchi(self)
+		self.sprites = SpriteCache()
+
+		#Reads the themes and styles the whole application.
+		self.themes = ThemeRegistry()
+		self.themes.apply('Light Theme')
+
+		self.saves = SaveStore()
+
+		#Every running tamagotchi is journaled so a crash loses at most a second.
+		self.journals = JournalStore()
+		self.journal_timer = QtCore.QTimer()
+		self.journal_timer.setInterval(1000)
+		self.journal_timer.timeout.connect(self.journals.flush)
+		self.journal_timer.start()
 
-		#Creates all of the windows
+		#The windows are made the first time they are needed, each tamagotchi gets its own Game window when it starts.
 		self.frames = {}
-		for f in (MainMenu, Game, HappinessGame):
-			frame = f(self, tamagotchi)
-			self.frames[f] = frame
-		
-		#creates all of the threads
-		self.threads = {}
-		for t in (Update, Sleeping, Sick):
-			thread = t(self, tamagotchi)
-			self.threads[t] = thread
+		self.games = []
+		#True while the clock is stopped to step through it a tick at a time
+		self.held = False
+		#how many times a second the Game windows redraw at most
+		self.frame_rate = frame_rate
 
-		self.show_window(MainMenu)
+		#While the metrics are on they are written to a file every few seconds.
+		self.metrics_timer = QtCore.QTimer()
+		self.metrics_timer.setInterval(5000)
+		self.metrics_timer.timeout.connect(lambda: metrics.dump('metrics.json'))
 
-		#Connect the threads to their respective methods.
-		self.threads[Update].countChanged.connect(self.frames[Game].onCountChanged)
-		self.threads[Sleeping].sleeping.connect(self.frames[Game].onSleep)
-		self.threads[Sick].sick.connect(self.frames[Game].onSick)
+		#One thread keeps time for all of the tamagotchis, it is started with the first one.
+		self.update = None
+
+		#The happiness game's choices come from one generator whose seed is kept with a recording.
+		self.seed = random.randrange(2 ** 32) if seed is None else seed
+		self.random = random.Random(self.seed)
+		#records what the user does if recording is the path of a file to record to
+		self.recorder = None if recording is None else Recorder(recording, self.seed)
+
+		self.show_window(MainMenu)
 
 	#Methods for showing and hiding windows, respectively.
 	def show_window(self, window):
-		window = self.frames[window]
-		window.show()
+		self.window(window).show()
 	def hide_window(self, window):
-		window = self.frames[window]
-		window.hide()
+		self.window(window).hide()
+
+	def window(self, window):
+		"""
+		Returns the window of the class, creating it the first time.
+		"""
+		if window not in self.frames:
+			self.frames[window] = window(self)
+		return self.frames[window]
+
+	def start_clock(self):
+		"""
+		Starts the thread that keeps time if it isn't running yet, it waits while no tamagotchis are running.
+		"""
+		if self.update is None:
+			self.update = Update(self)
+			self.update.ticked.connect(self.onTick)
+			self.update.pause()
+			self.update.start()
+
+	def start_game(self, name, health, hunger, happiness, style, age, sick=False, saved_at=None):
+		"""
+		Creates a tamagotchi with its own Game window and starts running it.
+		"""
+		if self.focus_game(name):
+			return
+		tamagotchi = Tamagotchi(self)
+		tamagotchi.start_game(name, health, hunger, happiness, style, age, sick, saved_at)
+
+	def recover_game(self, name):
+		"""
+		Carries on a tamagotchi from its journal, raises ValueError if the journal is damaged.
+		"""
+		if self.focus_game(name):
+			return
+		tamagotchi = Tamagotchi(self)
+		engine = Engine(tamagotchi)
+		self.journals.restore(name, engine)
+		#the happiness game it was playing is gone
+		if tamagotchi.playing_with_pet:
+			engine.play(False)
+		tamagotchi.open_game(engine, self.journals.modified(name))
+
+	def focus_game(self, name):
+		"""
+		Brings the Game window of the tamagotchi to the front if it is
+		already running, so it is never run twice. Returns True if it was.
+		"""
+		for game in self.games:
+			if game.tamagotchi.name == name:
+				self.hide_window(MainMenu)
+				game.show()
+				game.raise_()
+				game.activateWindow()
+				return True
+		return False
+
+	def game_names(self):
+		"""
+		The tamagotchis that can be loaded, from their saves or journals.
+		"""
+		return sorted(set(self.saves.names()) | set(self.journals.names()))
+
+	def add_game(self, game):
+		game.last_tick = self.update.now()
+		self.games.append(game)
+		game.speed.setCurrentIndex(self.speed_index())
+		game.metrics_shown(metrics.enabled)
+		game.set_frame_rate(self.frame_rate)
+		if not self.held:
+			self.update.resume()
+		self.reschedule()
 
+	def remove_game(self, game):
+		if game in self.games:
+			self.games.remove(game)
+		if not self.games:
+			self.update.pause()
 
-class Tamagotchi():
+	def speed_index(self):
+		speeds = [speed for name, speed in SPEEDS]
+		return speeds.index(self.update.scheduler.speed)
+
+	def set_speed(self, speed):
+		"""
+		Runs every tamagotchi and its gifs at the speed and stops stepping.
+		"""
+		self.update.set_speed(speed)
+		#the gifs play at 100x when the game is unbounded
+		self.sprites.set_speed(100 * (100 if speed is None else speed))
+		self.held = False
+		if self.games:
+			self.update.resume()
+		for game in self.games:
+			game.speed.setCurrentIndex(self.speed_index())
+
+	def set_metrics(self, enabled):
+		"""
+		Turns the metrics and every game's overlay of them on or off.
+		"""
+		metrics.enabled = enabled
+		if enabled:
+			self.metrics_timer.start()
+		else:
+			self.metrics_timer.stop()
+		for game in self.games:
+			game.metrics_shown(enabled)
+
+	def step(self):
+		"""
+		Stops the clock and advances every tamagotchi by one tick.
+		"""
+		self.held = True
+		self.update.pause()
+		self.update.step()
+		self.sync()
+
+	def onTick(self, clock):
+		if metrics.enabled:
+			metrics.count('ticked handled')
+		self.update.measure_lag(clock)
+		#if the windows fell behind, every tick missed since is applied in one go
+		self.advance(max(clock, self.update.now()))
+
+	def user_action(self, game, action, argument=None):
+		"""
+		Brings every tamagotchi up to now before the user does something to
+		one, so it happens on the tick it was done, and records it.
+		"""
+		self.sync()
+		if self.recorder is not None:
+			self.recorder.record(game.last_tick, game.tamagotchi.name, action, argument)
+
+	def sync(self):
+		"""
+		Brings every tamagotchi up to the current tick, for when
+		something is done to one between the ticks the clock woke for.
+		"""
+		self.advance(self.update.now())
+
+	def advance(self, clock):
+		for game in list(self.games):
+			game.onTick(clock)
+		self.reschedule()
+
+	def reschedule(self):
+		"""
+		Wakes the clock on the next tick where any tamagotchi has something happen.
+		"""
+		due = []
+		for game in self.games:
+			ticks = game.engine.next_tick()
+			if ticks is not None:
+				due.append(game.last_tick + ticks)
+		self.update.wake_at(min(due) if due else None)
+
+
+class Tamagotchi(Pet):
 	"""
 	hold all of the information about the tamagotchi
 	and handles the starting of the game
 	"""
+	__slots__ = ('parent',)
+
 	def __init__(self, parent):
 		"""
 		Sets all of the Tamamgotchi states
 		"""
+		super().__init__()
 		self.parent = parent
-		self.sick = False
-		self.dead = False
-		self.medicine_pressed = False
-		self.playing_with_pet = False
-		self.needs_discipline = False
-		self.needs_cleaning = False
-		self.style_name = 'Light Theme'
 
 
 
-	def start_game(self, name, health, hunger, happiness, style, age):
+	def start_game(self, name, health, hunger, happiness, style, age, sick=False, saved_at=None):
 		"""
-		Sets all of the tamagotchi's stats and starts the threads
+		Sets all of the tamagotchi's stats and starts running it.
+		If it was saved at a time, it catches up on the time it was away.
 		"""
 
-		self.name = name
-		self.health = str(health)
-		self.hunger = str(hunger)
-		self.happiness = str(happiness)
-		self.style_name = style
+		self.reset(name, health, hunger, happiness, style, age)
+		self.sick = sick
+		self.open_game(Engine(self), saved_at)
 
-		self.age = int(age)
-
-		self.DIRECTORY = './img/Eggplant/Eggplant'
-
-		self.sleeping = False
-		self.dead = False
-		self.sick = False
+	def open_game(self, engine, saved_at=None):
+		"""
+		Shows the tamagotchi in its own window and starts running it.
+		If it was saved at a time, it catches up on the time it was away.
+		"""
+		self.species = 'Eggplant'
+		self.parent.sprites.warm(self.species, [self.age])
+		self.parent.start_clock()
 		
-		#Initialise stats, start the threads and show/hide relevant windows.
-		self.parent.frames[Game].init_stats()
-		self.parent.threads[Update].start()
+		#Initialise stats, start running the tamagotchi and show/hide relevant windows.
+		game = Game(self.parent, self)
+		game.init_stats(engine)
+		self.parent.journals.open(engine)
+		self.parent.add_game(game)
+		if saved_at is not None:
+			away = max(0, time.time() - saved_at)
+			game.show_events(game.engine.catch_up(int(away / TICK_LENGTH)))
+		if self.parent.recorder is not None:
+			self.parent.recorder.opened(game.last_tick, engine)
 		self.parent.hide_window(MainMenu)
-		self.parent.show_window(Game)
+		game.show()
+
+def option(name):
+	"""
+	Returns the value given after an option on the command line, or None.
+	"""
+	if name in sys.argv[:-1]:
+		return sys.argv[sys.argv.index(name) + 1]
+	return None
 
 #Initialise the application.
+#python "Main file.py" --seed number --record file plays with the seed and records the session to the file.
+#--fps number sets how many times a second the windows redraw at most.
 app = QApplication(sys.argv)
-controller = AppWindow()
-app.exec_()
\ No newline at end of file
+seed = option('--seed')
+frame_rate = FRAME_RATE if option('--fps') is None else float(option('--fps'))
+#the frame timer counts in whole milliseconds, so a frame can't come more than 1000 times a second
+if not 0 < frame_rate <= 1000:
+	sys.exit('--fps must be more than 0 and at most 1000')
+controller = AppWindow(None if seed is None else int(seed), option('--record'), frame_rate)
+#python "Main file.py" --startup quits as soon as the menu is showing, to time how long that takes.
+if '--startup' in sys.argv:
+	QtCore.QTimer.singleShot(0, lambda: (print('menu shown', flush=True), app.quit()))
+app.exec_()
+#Stop the clock and finish writing any saves that are still waiting.
+if controller.update is not None:
+	controller.update.stop()
+controller.journals.close()
+if controller.recorder is not None:
+	controller.recorder.close()
+controller.saves.close()
\ No newline at end of file
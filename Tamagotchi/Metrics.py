@@ -0,0 +1,111 @@
+"""
+Counters and timing histograms for the hot paths of the game.
+
+They are off unless metrics.enabled is set, and every place that is
+measured checks it first, so when it is off the cost is one attribute
+lookup.
+"""
+import json, threading, time
+
+
+class Histogram():
+	"""
+	Timings in microseconds, counted in buckets that double in size.
+	"""
+	__slots__ = ('count', 'total', 'max', 'buckets')
+
+	def __init__(self):
+		self.count = 0
+		self.total = 0.0
+		self.max = 0.0
+		self.buckets = {} #bucket b holds timings under 2 ** b microseconds
+
+	def add(self, value):
+		self.count += 1
+		self.total += value
+		if value > self.max:
+			self.max = value
+		bucket = int(value).bit_length()
+		self.buckets[bucket] = self.buckets.get(bucket, 0) + 1
+
+	def to_dict(self):
+		return {
+			'count': self.count,
+			'mean_us': self.total / self.count if self.count else 0,
+			'max_us': self.max,
+			'buckets': dict(('<%d' % 2 ** bucket, count) for bucket, count in sorted(self.buckets.items())),
+		}
+
+
+class Metrics():
+	"""
+	Holds the counters, gauges and histograms by name.
+	"""
+	def __init__(self):
+		self.enabled = False
+		self.counters = {}
+		self.gauges = {} #the latest value of something
+		self.histograms = {}
+		#the save writer's thread records timings as well
+		self.lock = threading.Lock()
+
+	def count(self, name, amount=1):
+		with self.lock:
+			self.counters[name] = self.counters.get(name, 0) + amount
+
+	def set(self, name, value):
+		with self.lock:
+			self.gauges[name] = value
+
+	def record(self, name, seconds):
+		with self.lock:
+			histogram = self.histograms.get(name)
+			if histogram is None:
+				histogram = self.histograms[name] = Histogram()
+			histogram.add(seconds * 1e6)
+
+	def start(self):
+		"""
+		Returns the time to pass to stop, or None when the metrics are off.
+		"""
+		return time.perf_counter() if self.enabled else None
+
+	def stop(self, name, start):
+		if start is not None:
+			self.record(name, time.perf_counter() - start)
+
+	def reset(self):
+		with self.lock:
+			self.counters = {}
+			self.gauges = {}
+			self.histograms = {}
+
+	def to_dict(self):
+		with self.lock:
+			return {
+				'counters': dict(self.counters),
+				'gauges': dict(self.gauges),
+				'histograms': dict((name, histogram.to_dict()) for name, histogram in self.histograms.items()),
+			}
+
+	def summary(self):
+		"""
+		Returns the metrics as lines of text for the debug overlay.
+		"""
+		metrics = self.to_dict()
+		lines = ['%s: %d' % item for item in sorted(metrics['counters'].items())]
+		lines += ['%s: %.3f' % item for item in sorted(metrics['gauges'].items())]
+		for name, histogram in sorted(metrics['histograms'].items()):
+			lines.append('%s: %d, mean %.0fus, max %.0fus' % (name, histogram['count'], histogram['mean_us'], histogram['max_us']))
+		return '\n'.join(lines)
+
+	def dump(self, path):
+		"""
+		Writes the metrics to a JSON file along with the time they were taken.
+		"""
+		with open(path, 'w') as file:
+			json.dump(dict(self.to_dict(), time=time.time()), file, indent=2)
+
+
+#The one set of metrics the whole game records to.
+metrics = Metrics()
@@ -0,0 +1,133 @@
+"""
+Simulates very large numbers of tamagotchis at once.
+Every stat is a numpy array with one entry per pet, so a tick moves
+the whole population forward with a handful of array operations
+instead of running Engine.tick once per pet.
+"""
+#Needs the numpy library, pip install numpy is the command to install it.
+import numpy as np
+
+from Engine import (STATS, AGE, DISCIPLINE, CLEANING, UPDATE_SCHEDULE,
+	SLEEP_LENGTH, SLEEP_SCHEDULE, SLEEP_AMOUNTS, SICK_PERIOD, SICK_HEALTH, SICK_HAPPINESS,
+	MAX_STAT, MAX_AGE, DECAY)
+
+
+class Population():
+	"""
+	Holds the state of a population of pets as numpy arrays and applies
+	the same rules as Engine.tick to all of them.
+	"""
+	def __init__(self, size, health=MAX_STAT, hunger=MAX_STAT, happiness=MAX_STAT, age=1):
+		"""
+		The stats can be single numbers or arrays with one value per pet.
+		"""
+		self.size = size
+		self.clock = 0
+
+		#int16 so a stat can briefly go below 0 before it is clipped.
+		self.health = np.empty(size, dtype=np.int16)
+		self.hunger = np.empty(size, dtype=np.int16)
+		self.happiness = np.empty(size, dtype=np.int16)
+		self.age = np.empty(size, dtype=np.int8)
+		self.health[:] = health
+		self.hunger[:] = hunger
+		self.happiness[:] = happiness
+		self.age[:] = age
+
+		self.sick = np.zeros(size, dtype=bool)
+		self.dead = np.zeros(size, dtype=bool)
+		self.sleeping = np.zeros(size, dtype=bool)
+		self.needs_discipline = np.zeros(size, dtype=bool)
+		self.needs_cleaning = np.zeros(size, dtype=bool)
+
+		self.sleep_clock = np.zeros(size, dtype=np.int16)
+		self.sick_clock = np.zeros(size, dtype=np.int32)
+
+	@classmethod
+	def from_pets(cls, pets):
+		"""
+		Creates a population with the stats of a list of Pets.
+		"""
+		population = cls(len(pets),
+			[pet.health for pet in pets],
+			[pet.hunger for pet in pets],
+			[pet.happiness for pet in pets],
+			[pet.age for pet in pets])
+		population.sick[:] = [pet.sick for pet in pets]
+		population.dead[:] = [pet.dead for pet in pets]
+		population.sleeping[:] = [pet.sleeping for pet in pets]
+		return population
+
+	def change_stat(self, stat, amount, where):
+		"""
+		Changes a stat of the pets selected by where, keeping it between 0 and 100.
+		"""
+		values = getattr(self, stat)
+		np.add(values, amount, out=values, where=where)
+		np.clip(values, 0, MAX_STAT, out=values)
+
+	def getting_sick(self, alive):
+		#the tamagotchi doesnt get sick till it wakes up
+		sick = alive & ~self.sleeping & ~self.sick & ((self.hunger <= 0) | (self.happiness <= 0))
+		self.sick |= sick
+		self.sick_clock[sick] = 0
+
+	def on_update(self, value):
+		alive = ~self.dead
+		if value < 3:
+			self.change_stat(STATS[value], DECAY, alive)
+			self.getting_sick(alive)
+			self.dead |= alive & (self.health <= 0)
+
+		elif value == AGE:
+			np.add(self.age, 1, out=self.age, where=alive)
+			self.dead |= alive & (self.age > MAX_AGE)
+
+		elif value == DISCIPLINE:
+			self.needs_discipline |= alive & ~self.sick
+
+		elif value == CLEANING:
+			self.needs_cleaning |= alive & ~self.sick & ~self.sleeping
+
+	def tick(self):
+		"""
+		Advances every pet by one tick.
+		Returns the number of pets that are alive and the number that are sick.
+		"""
+		self.clock += 1
+		for period, value in UPDATE_SCHEDULE:
+			if not self.clock % period:
+				self.on_update(value)
+
+		sleeping = self.sleeping & ~self.dead
+		if sleeping.any():
+			self.sleep_clock[sleeping] += 1
+			for period, value in SLEEP_SCHEDULE:
+				self.change_stat(STATS[value], SLEEP_AMOUNTS[value], sleeping & (self.sleep_clock % period == 0))
+			self.sleeping &= ~(sleeping & (self.sleep_clock >= SLEEP_LENGTH))
+
+		#a sick pet is damaged as soon as it gets sick and then every second
+		sick = self.sick & ~self.dead
+		if sick.any():
+			damaged = sick & (self.sick_clock % SICK_PERIOD == 0)
+			self.change_stat('health', SICK_HEALTH, damaged)
+			self.change_stat('happiness', SICK_HAPPINESS, damaged)
+			self.dead |= damaged & (self.health <= 0)
+			self.sick_clock[sick] += 1
+
+		alive = ~self.dead
+		return int(alive.sum()), int((self.sick & alive).sum())
+
+	def run(self, ticks=None):
+		"""
+		Runs the population until every pet is dead or the ticks run out.
+		Returns a dictionary of numpy arrays with the number of pets that
+		were alive and sick after each tick.
+		"""
+		alive_counts = []
+		sick_counts = []
+		while not self.dead.all() and (ticks is None or len(alive_counts) < ticks):
+			alive, sick = self.tick()
+			alive_counts.append(alive)
+			sick_counts.append(sick)
+		return {'alive': np.array(alive_counts), 'sick': np.array(sick_counts)}
@@ -0,0 +1,48 @@
+"""
+Records what the user does in a session along with the tick of the
+shared clock it was done on, so the session can be played again the
+same way by Replay.py.
+
+A recording is a line of JSON with the seed of the happiness game's
+choices, then a line of [tick, name, action, argument] for each action:
+	'open' with the Journal snapshot of the tamagotchi as it started
+	'feed', 'medicine', 'lights', 'clean', 'discipline', 'save' and 'close'
+		from its Game window
+	'play', 'guess' with the direction, 'confirm' and 'close_play' from
+		the happiness game
+Every tamagotchi is brought up to the tick before an action is taken
+(see AppWindow.user_action), so the tick is all a replay needs.
+"""
+import json
+
+from Journal import encode_snapshot, decode
+
+
+class Recorder():
+	def __init__(self, path, seed):
+		self.file = open(path, 'w')
+		self.write({'seed': seed})
+
+	def write(self, line):
+		self.file.write(json.dumps(line) + '\n')
+		#flushed every time so a crash keeps the session up to then
+		self.file.flush()
+
+	def record(self, tick, name, action, argument=None):
+		self.write([tick, name, action, argument])
+
+	def opened(self, tick, engine):
+		snapshot = decode(encode_snapshot(engine))[0]
+		self.record(tick, engine.pet.name, 'open', list(snapshot))
+
+	def close(self):
+		self.file.close()
+
+
+def load(path):
+	"""
+	Returns the seed and the actions of a recording.
+	"""
+	with open(path) as file:
+		header = json.loads(file.readline())
+		return header['seed'], [json.loads(line) for line in file if line.strip()]
@@ -0,0 +1,153 @@
+"""
+Plays a session recorded with python "Main file.py" --record through the
+real Game and HappinessGame windows without showing anything on screen,
+as fast as it can run, and reports the wall time and what each phase
+cost, so the same session can be compared between versions.
+
+python Replay.py recording [results file]
+writes the results as JSON (replay.json by default).
+"""
+import sys, json, time, shutil, tempfile
+from random import Random
+
+#Headless sets Qt up to draw to memory, so it is imported first.
+from Headless import Host
+from PyQt5.QtWidgets import QApplication
+
+from Engine import Pet, Engine
+from Journal import replay
+from Recording import load
+from Windows import Game, HappinessGame
+
+#The button of the Game window each action clicks.
+BUTTONS = {'feed': 'feed', 'medicine': 'medicine', 'lights': 'sleep', 'play': 'game', 'clean': 'duck', 'discipline': 'discipline', 'save': 'save_game'}
+
+
+class Player(Host):
+	"""
+	Stands in for AppWindow with a clock that only moves when the recording does.
+	The clock still stops on every tick the Update thread would have woken
+	for, so the windows do the same work as they did in the session.
+	"""
+	def __init__(self, directory, seed):
+		super().__init__(directory)
+		self.random = Random(seed)
+		self.tick = 0
+		self.phases = {} #phase -> [count, seconds]
+
+	def timed(self, phase, function, *arguments):
+		start = time.perf_counter()
+		result = function(*arguments)
+		totals = self.phases.setdefault(phase, [0, 0.0])
+		totals[0] += 1
+		totals[1] += time.perf_counter() - start
+		return result
+
+	def user_action(self, game, action, argument=None):
+		self.sync()
+
+	def remove_game(self, game):
+		if game in self.games:
+			self.games.remove(game)
+
+	def sync(self):
+		self.advance(self.tick)
+
+	def advance(self, clock):
+		for game in list(self.games):
+			game.onTick(clock)
+
+	def due(self):
+		"""
+		Returns the next tick the Update thread would wake on, as AppWindow.reschedule works it out.
+		"""
+		due = []
+		for game in self.games:
+			ticks = game.engine.next_tick()
+			if ticks is not None:
+				due.append(game.last_tick + ticks)
+		return min(due) if due else None
+
+	def run_to(self, tick):
+		due = self.due()
+		while due is not None and due <= tick:
+			self.tick = due
+			self.timed('ticks', self.advance, due)
+			due = self.due()
+		self.tick = max(self.tick, tick)
+		self.draw()
+
+	def draw(self):
+		"""
+		Draws the frames the windows are waiting for. There is no Qt event
+		loop to run their timers, so it is done once before every action.
+		"""
+		for game in self.games:
+			if game.frame_timer.isActive():
+				game.frame_timer.stop()
+				self.timed('frames', game.render)
+
+	def open(self, tick, snapshot):
+		pet = Pet()
+		pet.species = 'Eggplant'
+		engine = Engine(pet)
+		replay(engine, snapshot, [])
+		game = Game(self, pet)
+		game.init_stats(engine)
+		game.last_tick = tick
+		self.games.append(game)
+		game.show()
+		return game
+
+	def play(self, actions):
+		games = {}
+		for tick, name, action, argument in actions:
+			self.run_to(tick)
+			if action == 'open':
+				games[name] = self.timed(action, self.open, tick, argument)
+			elif action == 'close':
+				self.timed(action, games[name].close)
+			elif action in BUTTONS:
+				self.timed(action, getattr(games[name], BUTTONS[action]).click)
+			else:
+				window = self.window(HappinessGame)
+				if action == 'guess':
+					self.timed(action, [window.guess_left, window.guess_right][argument].click)
+				elif action == 'confirm':
+					self.timed(action, window.confirm.click)
+				elif action == 'close_play':
+					self.timed(action, window.close)
+		return games
+
+
+def run(recording, output='replay.json'):
+	app = QApplication.instance() or QApplication(sys.argv)
+	seed, actions = load(recording)
+	directory = tempfile.mkdtemp()
+	try:
+		player = Player(directory, seed)
+		start = time.perf_counter()
+		games = player.play(actions)
+		wall = time.perf_counter() - start
+		player.saves.close()
+	finally:
+		shutil.rmtree(directory)
+
+	report = {
+		'recording': recording,
+		'actions': len(actions),
+		'ticks': player.tick,
+		'wall_s': wall,
+		'phases': dict((phase, {'count': count, 'seconds': seconds}) for phase, (count, seconds) in sorted(player.phases.items())),
+		#where each tamagotchi ended up, which is the same every time a recording is played
+		'pets': dict((name, {'stats': list(game.tamagotchi.stats.values), 'age': game.tamagotchi.age, 'dead': game.tamagotchi.dead})
+			for name, game in games.items()),
+	}
+	with open(output, 'w') as file:
+		json.dump(report, file, indent=2)
+	return report
+
+
+if __name__ == '__main__':
+	report = run(*sys.argv[1:])
+	print(json.dumps(report, indent=2))
@@ -0,0 +1,361 @@
+"""
+Stores the .TAMA save files along with an index of them.
+
+A save file is a fixed size header followed by the name and the style
+in utf-8:
+	magic b'TAMA', version, flags, health, hunger, happiness, age,
+	name length (2 bytes), style length, time it was saved (version 2 on),
+	crc32 of everything else.
+Bit 0 of the flags is set if the tamagotchi was sick.
+Older saves that are six lines of text are still read.
+
+Saves are read as (name, health, hunger, happiness, style, age, sick, saved_at),
+saved_at is None for saves from before version 2 and text saves.
+"""
+import os, sys, sqlite3, struct, threading, time, zlib
+from collections import OrderedDict
+from concurrent.futures import Future
+from glob import glob
+
+from Metrics import metrics
+
+MAGIC = b'TAMA'
+VERSION = 2
+HEADERS = {
+	1: struct.Struct('<4sBBBBBBHBI'),
+	2: struct.Struct('<4sBBBBBBHBdI'),
+}
+HEADER = HEADERS[VERSION]
+SICK = 1
+
+
+def encode(contents):
+	"""
+	Packs the contents of a save into the save format.
+	"""
+	name, health, hunger, happiness, style, age, sick, saved_at = contents
+	name = name.encode('utf-8')
+	style = style.encode('utf-8')
+	flags = SICK if sick else 0
+	header = HEADER.pack(MAGIC, VERSION, flags, health, hunger, happiness, age, len(name), len(style), saved_at or 0, 0)
+	body = name + style
+	#The checksum is the last field of the header.
+	checksum = zlib.crc32(body, zlib.crc32(header[:-4]))
+	return header[:-4] + struct.pack('<I', checksum) + body
+
+
+def decode(data):
+	"""
+	Unpacks a save file, raises ValueError if the file is damaged.
+	"""
+	if not data.startswith(MAGIC):
+		return decode_text(data)
+	try:
+		return decode_binary(data)
+	except ValueError as error:
+		#a text save for a pet whose name starts with TAMA
+		try:
+			return decode_text(data)
+		except ValueError:
+			raise error from None
+
+
+def decode_binary(data):
+	"""
+	Unpacks a save in the binary format, raises ValueError if it isn't one
+	or is damaged.
+	"""
+	if not data.startswith(MAGIC):
+		raise ValueError('save file is not in the binary format')
+	if len(data) < len(MAGIC) + 1:
+		raise ValueError('save file is too short')
+	version = data[len(MAGIC)]
+	if version not in HEADERS:
+		raise ValueError('save file version %d is newer than this game' % version)
+	header = HEADERS[version]
+	if len(data) < header.size:
+		raise ValueError('save file is too short')
+
+	fields = header.unpack_from(data)
+	flags, health, hunger, happiness, age, name_length, style_length = fields[2:9]
+	#0 is written when the time isn't known
+	saved_at = fields[9] or None if version >= 2 else None
+	if len(data) != header.size + name_length + style_length:
+		raise ValueError('save file has the wrong length')
+	body = data[header.size:]
+	if zlib.crc32(body, zlib.crc32(data[:header.size - 4])) != fields[-1]:
+		raise ValueError('save file checksum does not match')
+
+	name = body[:name_length].decode('utf-8')
+	style = body[name_length:].decode('utf-8')
+	return name, health, hunger, happiness, style, age, bool(flags & SICK), saved_at
+
+
+def decode_text(data):
+	"""
+	Reads the old saves that were six lines of text.
+	"""
+	lines = data.decode('utf-8').split('\n')
+	if len(lines) != 6:
+		raise ValueError('text save file should have 6 lines')
+	name, health, hunger, happiness, style, age = lines
+	return name, int(health), int(hunger), int(happiness), style, int(age), False, None
+
+
+def convert(directory='./saves/'):
+	"""
+	Rewrites every text save in the folder in the binary format.
+	Returns the number of saves converted and the names of the ones that could not be read.
+	"""
+	store = SaveStore(directory)
+	converted = 0
+	failed = []
+	for path in glob(directory + '*.TAMA'):
+		with open(path, 'rb') as f:
+			data = f.read()
+		try:
+			decode_binary(data)
+			continue
+		except ValueError:
+			pass
+		try:
+			contents = decode_text(data)
+		except ValueError:
+			failed.append(os.path.basename(path)[:-5])
+			continue
+		store.write(contents[0], contents)
+		converted += 1
+	store.close()
+	return converted, failed
+
+
+class SaveWriter():
+	"""
+	Writes saves on a background thread so the windows never wait on the disk.
+	If a pet is saved again before its last save was written only the
+	newest contents are written, and every caller's future completes
+	once they are.
+	"""
+	def __init__(self, store):
+		self.store = store
+		self.pending = OrderedDict() #name -> (contents or None to delete, futures)
+		self.writing = {} #the save being written, until it is in the index
+		self.condition = threading.Condition()
+		self.closed = False
+		#the thread is started by the first save
+		self.thread = None
+
+	def submit(self, name, contents):
+		"""
+		Queues the contents to be written, or the save to be deleted if
+		contents is None. Returns a Future that is set to the name once done.
+		"""
+		future = Future()
+		with self.condition:
+			if self.thread is None:
+				self.thread = threading.Thread(target=self.run, daemon=True)
+				self.thread.start()
+			futures = self.pending.pop(name, (None, []))[1]
+			futures.append(future)
+			self.pending[name] = (contents, futures)
+			self.condition.notify()
+		return future
+
+	def queued(self, name):
+		"""
+		Returns (True, contents) if the save has a write waiting, contents
+		being None if it is waiting to be deleted.
+		"""
+		with self.condition:
+			for queue in (self.pending, self.writing):
+				if name in queue:
+					return True, queue[name][0]
+			return False, None
+
+	def queued_names(self):
+		with self.condition:
+			queue = dict(self.writing)
+			queue.update(self.pending)
+			return [(name, contents is not None) for name, (contents, futures) in queue.items()]
+
+	def run(self):
+		while True:
+			with self.condition:
+				while not self.pending and not self.closed:
+					self.condition.wait()
+				if not self.pending:
+					return
+				name, (contents, futures) = self.pending.popitem(last=False)
+				self.writing = {name: (contents, futures)}
+			try:
+				if contents is None:
+					self.store.remove(name)
+				else:
+					self.store.write(name, contents)
+			except Exception as error:
+				for future in futures:
+					future.set_exception(error)
+			else:
+				for future in futures:
+					future.set_result(name)
+			with self.condition:
+				self.writing = {}
+
+	def close(self):
+		"""
+		Writes everything that is waiting and stops the thread.
+		"""
+		with self.condition:
+			self.closed = True
+			self.condition.notify()
+		if self.thread is not None:
+			self.thread.join()
+
+
+class SaveStore():
+	"""
+	Keeps the save files in the saves folder and an SQLite index of
+	their names and stats, so listing and finding saves does not read
+	the folder.
+	The index is kept beside the folder rather than in it, so the
+	folder only changes when a save is added or removed. If its
+	modified time is not the one the index recorded, another program
+	has changed it and the index is rebuilt.
+	"""
+	def __init__(self, directory='./saves/', index=None):
+		os.makedirs(directory, exist_ok=True)
+		self.directory = directory
+		#the writer thread uses the index too, so every use of it holds the lock
+		self.lock = threading.Lock()
+		self.db = sqlite3.connect(index or directory.rstrip('/') + '.sqlite', check_same_thread=False)
+		self.db.execute('CREATE TABLE IF NOT EXISTS saves (name TEXT PRIMARY KEY, health INTEGER, hunger INTEGER, happiness INTEGER, style TEXT, age INTEGER, modified INTEGER)')
+		self.db.execute('CREATE TABLE IF NOT EXISTS info (key TEXT PRIMARY KEY, value INTEGER)')
+		row = self.db.execute("SELECT value FROM info WHERE key = 'modified'").fetchone()
+		if row is None or row[0] != self.directory_modified():
+			self.rebuild()
+		self.writer = SaveWriter(self)
+
+	def path(self, name):
+		return self.directory + name + '.TAMA'
+
+	def directory_modified(self):
+		return os.stat(self.directory).st_mtime_ns
+
+	def record_directory(self):
+		self.db.execute("INSERT OR REPLACE INTO info VALUES ('modified', ?)", (self.directory_modified(),))
+		self.db.commit()
+
+	def index(self, contents, modified):
+		name, health, hunger, happiness, style, age = contents[:6]
+		self.db.execute('INSERT OR REPLACE INTO saves VALUES (?, ?, ?, ?, ?, ?, ?)',
+			(name, int(health), int(hunger), int(happiness), style, int(age), modified))
+
+	def rebuild(self):
+		"""
+		Reads every save file in the folder into a new index.
+		"""
+		with self.lock:
+			self.db.execute('DELETE FROM saves')
+			for path in glob(self.directory + '*.TAMA'):
+				try:
+					contents = self.read(path)
+					self.index(contents, os.stat(path).st_mtime_ns)
+				except (ValueError, OSError):
+					#leave out save files that can't be read
+					continue
+			self.record_directory()
+
+	def read(self, path):
+		start = metrics.start()
+		with open(path, 'rb') as f:
+			data = f.read()
+		metrics.stop('save read', start)
+		return decode(data)
+
+	def names(self):
+		with self.lock:
+			names = set(row[0] for row in self.db.execute('SELECT name FROM saves'))
+		#include the saves that are still waiting to be written
+		for name, saved in self.writer.queued_names():
+			if saved:
+				names.add(name)
+			else:
+				names.discard(name)
+		return sorted(names)
+
+	def contains(self, name):
+		queued, contents = self.writer.queued(name)
+		if queued:
+			return contents is not None
+		with self.lock:
+			return self.db.execute('SELECT 1 FROM saves WHERE name = ?', (name,)).fetchone() is not None
+
+	def stats(self, name):
+		"""
+		Returns the (health, hunger, happiness, style, age) of a save from the index.
+		"""
+		with self.lock:
+			return self.db.execute('SELECT health, hunger, happiness, style, age FROM saves WHERE name = ?', (name,)).fetchone()
+
+	def load(self, name):
+		"""
+		Returns the contents of a save file in the order start_game takes them.
+		"""
+		queued, contents = self.writer.queued(name)
+		if queued and contents is not None:
+			return contents
+		return self.read(self.path(name))
+
+	def save(self, pet):
+		"""
+		Queues the pet's current stats to be saved, returns a Future.
+		"""
+		contents = (pet.name, pet.health, pet.hunger, pet.happiness, pet.style_name, pet.age, pet.sick, time.time())
+		return self.writer.submit(pet.name, contents)
+
+	def delete(self, name):
+		"""
+		Queues the save to be deleted, returns a Future.
+		"""
+		return self.writer.submit(name, None)
+
+	def write(self, name, contents):
+		"""
+		Writes a save to a temporary file and then renames it over the
+		old one, so a crash part way through never leaves half a save.
+		"""
+		path = self.path(name)
+		temp = path + '.tmp'
+		start = metrics.start()
+		with open(temp, 'wb') as file:
+			file.write(encode(contents))
+			file.flush()
+			os.fsync(file.fileno())
+		os.replace(temp, path)
+		metrics.stop('save write', start)
+		with self.lock:
+			self.index(contents, os.stat(path).st_mtime_ns)
+			self.record_directory()
+
+	def remove(self, name):
+		start = metrics.start()
+		if os.path.exists(self.path(name)):
+			os.remove(self.path(name))
+		metrics.stop('save remove', start)
+		with self.lock:
+			self.db.execute('DELETE FROM saves WHERE name = ?', (name,))
+			self.record_directory()
+
+	def close(self):
+		"""
+		Finishes writing the saves that are waiting.
+		"""
+		self.writer.close()
+
+
+if __name__ == '__main__':
+	#python Saves.py [folder] converts the text saves in a folder.
+	converted, failed = convert(*sys.argv[1:])
+	print('Converted %d saves.' % converted)
+	for name in failed:
+		print('Could not read ' + name)
@@ -0,0 +1,214 @@
+"""
+A tick clock that sleeps until the next tick with something due
+instead of waking up on every tick to check.
+"""
+import threading, time, heapq
+
+from Engine import TICK_LENGTH
+
+
+class Job():
+	"""
+	A callback that the scheduler runs every period ticks,
+	either count times or until it is cancelled.
+	"""
+	def __init__(self, scheduler, period, callback, count, order):
+		self.scheduler = scheduler
+		self.period = period
+		self.callback = callback
+		self.count = count
+		self.order = order
+		self.cancelled = False
+
+	def cancel(self):
+		self.scheduler.cancel_job(self)
+
+
+class Scheduler():
+	"""
+	Runs jobs on a clock of tick_length seconds, sped up by speed.
+
+	Every deadline is worked out from the time the clock was last at a
+	known tick so it does not drift, and the thread waits on a condition
+	so pause, resume, a change of speed and cancel take effect straight away.
+	"""
+	def __init__(self, tick_length=TICK_LENGTH):
+		self.tick_length = tick_length
+		self.speed = 1 #None runs the jobs as fast as they can run
+		self.clock = 0
+		self.jobs = [] #heap of (due tick, order, job)
+		self.order = 0
+		self.condition = threading.Condition()
+		#the clock was at base_tick at base_time, base_time is None till it runs
+		self.base_time = None
+		self.base_tick = 0
+		self.paused = False
+		self.cancelled = False
+
+	def every(self, period, callback, count=None, delay=None):
+		"""
+		Runs callback(clock) every period ticks, the first time after delay ticks.
+		Jobs that are due on the same tick run in the order they were added.
+		"""
+		with self.condition:
+			job = Job(self, period, callback, count, self.order)
+			self.order += 1
+			heapq.heappush(self.jobs, (self.clock + (period if delay is None else delay), job.order, job))
+			self.condition.notify()
+		return job
+
+	def later(self, delay, callback):
+		"""
+		Runs callback(clock) once after delay ticks.
+		"""
+		return self.every(delay, callback, count=1)
+
+	def at(self, clock, callback):
+		"""
+		Runs callback(clock) once on the tick, or straight away if it has passed.
+		"""
+		with self.condition:
+			return self.later(max(clock - self.clock, 0), callback)
+
+	def cancel_job(self, job):
+		with self.condition:
+			job.cancelled = True
+			self.condition.notify()
+
+	def next_due(self):
+		"""
+		Returns the tick the next job is due on, or None if there are no jobs.
+		"""
+		with self.condition:
+			self.drop_cancelled()
+			return self.jobs[0][0] if self.jobs else None
+
+	def now(self):
+		"""
+		Returns the tick the clock has reached, which is past the last
+		tick a job ran on when there was nothing due in between.
+		"""
+		with self.condition:
+			return int(self.position(time.monotonic()))
+
+	def position(self, now):
+		"""
+		Returns how many ticks the clock has reached at the time now, with the fraction of a tick.
+		"""
+		if self.base_time is None or self.paused or self.speed is None:
+			return max(self.clock, self.base_tick)
+		return max(self.clock, self.base_tick + (now - self.base_time) * self.speed / self.tick_length)
+
+	def rebase(self):
+		now = time.monotonic()
+		if self.base_time is not None:
+			self.base_tick = self.position(now)
+			self.base_time = now
+
+	def lag(self, clock):
+		"""
+		Returns how many seconds after its deadline the tick is, 0 if it
+		isn't late or the clock is paused or unbounded.
+		"""
+		with self.condition:
+			if self.base_time is None or self.paused or self.speed is None:
+				return 0.0
+			return max(0.0, time.monotonic() - self.deadline(clock))
+
+	def drop_cancelled(self):
+		while self.jobs and self.jobs[0][2].cancelled:
+			heapq.heappop(self.jobs)
+
+	def deadline(self, clock):
+		if self.speed is None:
+			return float('-inf')
+		return self.base_time + (clock - self.base_tick) * self.tick_length / self.speed
+
+	def wait_for_jobs(self):
+		"""
+		Waits until the next tick with jobs due and returns those jobs,
+		or None once the scheduler has been cancelled.
+		"""
+		while not self.cancelled:
+			self.drop_cancelled()
+			if self.paused or not self.jobs:
+				self.condition.wait()
+				continue
+
+			due = self.jobs[0][0]
+			timeout = self.deadline(due) - time.monotonic()
+			if timeout > 0:
+				#woken early if a job is added or the scheduler is paused or cancelled
+				self.condition.wait(timeout)
+				continue
+
+			self.clock = due
+			ready = []
+			while self.jobs and self.jobs[0][0] == due:
+				job = heapq.heappop(self.jobs)[2]
+				if job.cancelled:
+					continue
+				ready.append(job)
+				if job.count is not None:
+					job.count -= 1
+				if job.count is None or job.count > 0:
+					heapq.heappush(self.jobs, (due + job.period, job.order, job))
+			return ready
+		return None
+
+	def run(self, on_tick=None):
+		"""
+		Runs the jobs as they become due until the scheduler is cancelled.
+		on_tick(clock) is called after all of the jobs due on a tick have run.
+		"""
+		with self.condition:
+			#time spent paused before the scheduler started doesn't count
+			self.base_time = time.monotonic()
+		while True:
+			with self.condition:
+				ready = self.wait_for_jobs()
+			if ready is None:
+				return
+			for job in ready:
+				job.callback(self.clock)
+			if on_tick is not None:
+				on_tick(self.clock)
+
+	def pause(self):
+		with self.condition:
+			if not self.paused:
+				self.rebase()
+				self.paused = True
+			self.condition.notify()
+
+	def resume(self):
+		with self.condition:
+			if self.paused:
+				#the clock carries on from the tick it was paused on
+				self.rebase()
+				self.paused = False
+			self.condition.notify()
+
+	def set_speed(self, speed):
+		"""
+		Runs the clock speed times faster than tick_length, or as fast as
+		the jobs can run if speed is None, carrying on from the current tick.
+		"""
+		with self.condition:
+			self.rebase()
+			self.speed = speed
+			self.condition.notify()
+
+	def step(self, ticks=1):
+		"""
+		Moves the clock forward by the ticks straight away, even while it is paused.
+		"""
+		with self.condition:
+			self.rebase()
+			self.base_tick = int(self.base_tick) + ticks
+			self.condition.notify()
+
+	def cancel(self):
+		with self.condition:
+			self.cancelled = True
+			self.condition.notify()
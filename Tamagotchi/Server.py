@@ -0,0 +1,400 @@
+"""
+Runs any number of tamagotchis in one asyncio event loop without any
+windows, and lets clients look after them over a local socket.
+
+Each pet waits on a timer for the next tick that changes anything for
+it (Engine.next_tick). The timer then advances the pet through the
+update, sleeping and sick schedules up to that tick, so a pet costs
+nothing between the ticks where something happens.
+
+Every message is a fixed size header followed by a name in utf-8:
+	request: the index of the command in COMMANDS, an argument and the
+		name length (REQUEST struct). The argument is 1 to win with
+		play and 0 otherwise.
+	reply or update: REPLY or UPDATE, health, hunger, happiness, age,
+		flags (Journal.FLAGS), events (EVENTS), clock and the name length
+		(STATE struct)
+	error: ERROR and the message length (ERROR_HEADER struct), then the message
+Name and message lengths are 2 bytes, so names are up to MAX_NAME bytes
+in utf-8 and longer error messages are cut short.
+Every request gets a reply or an error, in the order they were sent.
+A client that subscribes to a pet is also sent an UPDATE when its stats
+or states change.
+
+python Server.py [socket path or host:port] [speed]
+serves the pets in the saves folder, on localhost:8641 by default.
+"""
+import asyncio, struct, sys, time
+from collections import deque
+
+from Engine import Pet, Engine, TICK_LENGTH
+from Journal import FLAGS
+from Saves import SaveStore
+from Metrics import metrics
+
+COMMANDS = ['open', 'close', 'feed', 'play', 'medicine', 'sleep', 'wake', 'clean', 'discipline', 'save', 'subscribe', 'unsubscribe']
+#The commands that are actions of the engine.
+ACTIONS = ['feed', 'play', 'medicine', 'sleep', 'wake', 'clean', 'discipline']
+EVENTS = ['sick', 'cured', 'asleep', 'awake', 'aged', 'dead', 'discipline', 'cleaning']
+
+REQUEST = struct.Struct('<BBH')
+STATE = struct.Struct('<BBBBBBBIH')
+ERROR_HEADER = struct.Struct('<BH')
+REPLY, UPDATE, ERROR = 0, 1, 2
+#The longest name or message in utf-8 that fits in its length.
+MAX_NAME = 0xffff
+
+ADDRESS = 'localhost:8641'
+
+
+def encode_request(command, name, argument=0):
+	name = name.encode('utf-8')
+	if len(name) > MAX_NAME:
+		raise ValueError('names are at most %d bytes' % MAX_NAME)
+	return REQUEST.pack(COMMANDS.index(command), argument, len(name)) + name
+
+
+def encode_state(kind, engine, events=()):
+	pet = engine.pet
+	name = pet.name.encode('utf-8')
+	flags = sum(1 << bit for bit, flag in enumerate(FLAGS) if getattr(pet, flag))
+	events = sum(1 << bit for bit, event in enumerate(EVENTS) if event in events)
+	return STATE.pack(kind, pet.health, pet.hunger, pet.happiness, pet.age, flags, events, engine.clock, len(name)) + name
+
+
+def encode_error(message):
+	#cut on a whole character so the client can still decode it
+	message = message.encode('utf-8')[:MAX_NAME].decode('utf-8', 'ignore').encode('utf-8')
+	return ERROR_HEADER.pack(ERROR, len(message)) + message
+
+
+def decode_state(header, name):
+	"""
+	Returns a reply or update as a dictionary of the pet's name, stats, states and events.
+	"""
+	kind, health, hunger, happiness, age, flags, events, clock = STATE.unpack(header)[:-1]
+	state = {'name': name.decode('utf-8'), 'health': health, 'hunger': hunger, 'happiness': happiness, 'age': age, 'clock': clock}
+	for bit, flag in enumerate(FLAGS):
+		state[flag] = bool(flags & 1 << bit)
+	state['events'] = [event for bit, event in enumerate(EVENTS) if events & 1 << bit]
+	return state
+
+
+def address(text):
+	"""
+	Returns (host, port) for host:port, otherwise the text is a unix socket path.
+	"""
+	host, colon, port = text.rpartition(':')
+	return (host, int(port)) if colon and port.isdigit() else text
+
+
+class Hosted():
+	"""
+	A pet the server is running, with the server tick its engine was last
+	advanced to and the clients subscribed to it.
+	"""
+	__slots__ = ('engine', 'last_tick', 'timer', 'subscribers', 'sent')
+
+	def __init__(self, engine, last_tick):
+		self.engine = engine
+		self.last_tick = last_tick
+		self.timer = None
+		self.subscribers = set()
+		self.sent = None #the last stats and states sent to the subscribers
+
+
+class PetServer():
+	"""
+	Hosts the pets by name and applies the clients' requests to them.
+	The server's clock runs speed times faster than TICK_LENGTH from when
+	the first pet is opened.
+	"""
+	def __init__(self, saves=None, speed=1, tick_length=TICK_LENGTH):
+		self.saves = saves
+		self.speed = speed
+		self.tick_length = tick_length
+		self.pets = {}
+		self.loop = None
+		self.start = None
+		self.server = None
+
+	def begin(self):
+		if self.loop is None:
+			self.loop = asyncio.get_running_loop()
+			self.start = self.loop.time()
+
+	def now(self):
+		return int((self.loop.time() - self.start) * self.speed / self.tick_length)
+
+	def deadline(self, tick):
+		return self.start + tick * self.tick_length / self.speed
+
+	async def listen(self, address):
+		"""
+		Starts serving clients on a unix socket path, or (host, port) for TCP.
+		"""
+		self.begin()
+		if isinstance(address, tuple):
+			self.server = await asyncio.start_server(self.serve, *address)
+		else:
+			self.server = await asyncio.start_unix_server(self.serve, address)
+		return self.server
+
+	def hosted(self, name):
+		if name not in self.pets:
+			raise ValueError(name + ' is not open')
+		return self.pets[name]
+
+	def open(self, name):
+		"""
+		Starts running the pet from its save, catching up on the time it
+		was away, or as a new pet if it has no save.
+		"""
+		self.begin()
+		if name in self.pets:
+			return self.pets[name], []
+		events = []
+		if self.saves is not None and self.saves.contains(name):
+			contents = self.saves.load(name)
+			pet = Pet(*contents[:6])
+			pet.sick = contents[6]
+			engine = Engine(pet)
+			if contents[7] is not None:
+				away = max(0, time.time() - contents[7])
+				events = engine.catch_up(int(away / TICK_LENGTH))
+		else:
+			engine = Engine(Pet(name))
+		hosted = self.pets[name] = Hosted(engine, self.now())
+		#the time away is handled like any other ticks, so a pet that died while away loses its save
+		self.changed(hosted, events)
+		self.reschedule(hosted)
+		return hosted, events
+
+	def close(self, name, save=True):
+		"""
+		Stops running the pet, saving it first.
+		Returns the pet, the events up to now and the save's Future.
+		"""
+		hosted = self.hosted(name)
+		events = self.advance(hosted)
+		self.changed(hosted, events)
+		del self.pets[name]
+		if hosted.timer is not None:
+			hosted.timer.cancel()
+		future = None
+		if save and self.saves is not None and not hosted.engine.pet.dead:
+			future = self.saves.save(hosted.engine.pet)
+		return hosted, events, future
+
+	def advance(self, hosted, tick=None):
+		"""
+		Brings the pet up to the tick, or the current tick.
+		"""
+		tick = self.now() if tick is None else max(tick, self.now())
+		events = hosted.engine.advance(tick - hosted.last_tick)
+		hosted.last_tick = tick
+		return events
+
+	def reschedule(self, hosted):
+		"""
+		Sets the pet's timer for the next tick that changes anything.
+		"""
+		if hosted.timer is not None:
+			hosted.timer.cancel()
+		ticks = hosted.engine.next_tick()
+		hosted.timer = None if ticks is None else \
+			self.loop.call_at(self.deadline(hosted.last_tick + ticks), self.wake, hosted, hosted.last_tick + ticks)
+
+	def wake(self, hosted, tick):
+		if metrics.enabled:
+			metrics.count('server wakes')
+		hosted.timer = None
+		self.changed(hosted, self.advance(hosted, tick))
+		self.reschedule(hosted)
+
+	def act(self, hosted, action, argument=0):
+		"""
+		Runs an action on the pet as of the current tick.
+		"""
+		events = self.advance(hosted)
+		engine = hosted.engine
+		if action == 'play':
+			#a client plays a whole game in one request
+			events += engine.start_play() + engine.play(bool(argument))
+		else:
+			events += getattr(engine, action)()
+		self.reschedule(hosted)
+		self.changed(hosted, events)
+		return events
+
+	def changed(self, hosted, events):
+		"""
+		Deletes the save of a pet that died and sends an update to the
+		subscribers if anything about the pet has changed.
+		"""
+		pet = hosted.engine.pet
+		if 'dead' in events and self.saves is not None:
+			self.saves.delete(pet.name)
+		if not hosted.subscribers:
+			return
+		sent = tuple(pet.stats.values) + (pet.age,) + tuple(getattr(pet, flag) for flag in FLAGS)
+		if sent == hosted.sent and not events:
+			return
+		hosted.sent = sent
+		update = encode_state(UPDATE, hosted.engine, events)
+		for writer in hosted.subscribers:
+			writer.write(update)
+
+	async def request(self, command, argument, name, writer, subscribed):
+		"""
+		Carries out a request and returns the pet and the events that happened.
+		"""
+		if command == 'open':
+			return self.open(name)
+		if command == 'close':
+			hosted, events, future = self.close(name)
+			subscribed.discard(hosted)
+			if future is not None:
+				await asyncio.wrap_future(future)
+			return hosted, events
+		hosted = self.hosted(name)
+		if command in ACTIONS:
+			return hosted, self.act(hosted, command, argument)
+		events = self.advance(hosted)
+		self.reschedule(hosted)
+		if command == 'save':
+			if self.saves is None:
+				raise ValueError('the server has no saves folder')
+			if hosted.engine.pet.dead:
+				raise ValueError(name + ' is dead')
+			await asyncio.wrap_future(self.saves.save(hosted.engine.pet))
+		elif command == 'subscribe':
+			hosted.subscribers.add(writer)
+			subscribed.add(hosted)
+		elif command == 'unsubscribe':
+			hosted.subscribers.discard(writer)
+			subscribed.discard(hosted)
+		return hosted, events
+
+	async def serve(self, reader, writer):
+		"""
+		Answers one client's requests until it disconnects.
+		"""
+		subscribed = set()
+		try:
+			while True:
+				try:
+					command, argument, length = REQUEST.unpack(await reader.readexactly(REQUEST.size))
+					name = await reader.readexactly(length)
+				except (asyncio.IncompleteReadError, ConnectionError):
+					break
+				start = metrics.start()
+				try:
+					if command >= len(COMMANDS):
+						raise ValueError('unknown command %d' % command)
+					hosted, events = await self.request(COMMANDS[command], argument, name.decode('utf-8'), writer, subscribed)
+				except (ValueError, OSError) as error:
+					writer.write(encode_error(str(error)))
+				else:
+					writer.write(encode_state(REPLY, hosted.engine, events))
+				metrics.stop('server request', start)
+				await writer.drain()
+		finally:
+			for hosted in subscribed:
+				hosted.subscribers.discard(writer)
+			writer.close()
+
+	async def shutdown(self, save=True):
+		"""
+		Stops serving and closes every pet, waiting for their saves to be written.
+		"""
+		if self.server is not None:
+			self.server.close()
+			await self.server.wait_closed()
+		futures = [self.close(name, save)[2] for name in list(self.pets)]
+		for future in futures:
+			if future is not None:
+				await asyncio.wrap_future(future)
+
+
+class Client():
+	"""
+	A connection to a PetServer. request returns the reply as a dictionary
+	(see decode_state) or raises ValueError with the server's error, and
+	the updates for subscribed pets are put on the updates queue.
+	"""
+	def __init__(self, reader, writer):
+		self.reader = reader
+		self.writer = writer
+		self.replies = deque() #futures waiting for replies, in the order they were sent
+		self.updates = asyncio.Queue()
+		self.reading = asyncio.create_task(self.read())
+
+	@classmethod
+	async def connect(cls, address):
+		if isinstance(address, tuple):
+			reader, writer = await asyncio.open_connection(*address)
+		else:
+			reader, writer = await asyncio.open_unix_connection(address)
+		return cls(reader, writer)
+
+	async def read(self):
+		reader = self.reader
+		failure = ConnectionError('the server closed the connection')
+		try:
+			while True:
+				kind = await reader.readexactly(1)
+				if kind[0] == ERROR:
+					length = ERROR_HEADER.unpack(kind + await reader.readexactly(ERROR_HEADER.size - 1))[1]
+					message = (await reader.readexactly(length)).decode('utf-8')
+					self.replies.popleft().set_exception(ValueError(message))
+					continue
+				header = kind + await reader.readexactly(STATE.size - 1)
+				state = decode_state(header, await reader.readexactly(STATE.unpack(header)[-1]))
+				if kind[0] == UPDATE:
+					self.updates.put_nowait(state)
+				else:
+					self.replies.popleft().set_result(state)
+		except (asyncio.IncompleteReadError, ConnectionError):
+			pass
+		except Exception as error:
+			#nothing after a message that can't be read can be read either
+			failure = error
+		while self.replies:
+			self.replies.popleft().set_exception(failure)
+
+	async def request(self, command, name, argument=0):
+		request = encode_request(command, name, argument)
+		if self.reading.done():
+			raise ConnectionError('the connection to the server is closed')
+		future = asyncio.get_running_loop().create_future()
+		self.replies.append(future)
+		self.writer.write(request)
+		await self.writer.drain()
+		return await future
+
+	async def close(self):
+		self.writer.close()
+		await self.writer.wait_closed()
+		await self.reading
+
+
+async def main(where=ADDRESS, speed=1):
+	server = PetServer(SaveStore(), speed)
+	listener = await server.listen(address(where))
+	try:
+		await listener.serve_forever()
+	finally:
+		#save every pet when the server is stopped
+		await server.shutdown()
+		server.saves.close()
+
+
+if __name__ == '__main__':
+	arguments = sys.argv[1:]
+	if len(arguments) > 1:
+		arguments[1] = float(arguments[1])
+	try:
+		asyncio.run(main(*arguments))
+	except KeyboardInterrupt:
+		pass
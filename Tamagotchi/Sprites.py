@@ -0,0 +1,102 @@
+from PyQt5 import QtCore, QtGui
+from collections import OrderedDict
+
+from Metrics import metrics
+
+
+class SpriteCache():
+	"""
+	Loads and scales each sprite once and keeps the most recently
+	used ones, so changing the tamagotchi's sprite does not read the
+	image from disk again.
+	The gifs are shared by every window showing them, so windows start
+	and stop them through play and pause, which only stop a gif once no
+	window is showing it.
+	"""
+
+	#The end of the file name for each pose of a species.
+	POSES = {'': '.gif', 'Sleep': '-Sleep.gif', 'Sick': '-Sick.png', 'Left': '-Left.png', 'Right': '-Right.png'}
+
+	def __init__(self, max_size=32, directory='./img/'):
+		self.max_size = max_size
+		self.directory = directory
+		self.sprites = OrderedDict()
+		#the number of windows showing each gif, they are kept here while shown even if the cache drops them
+		self.playing = {}
+		#the speed the gifs play at as a percentage, it follows the game speed
+		self.speed = 100
+
+	def path(self, species, age, pose):
+		if pose == 'dead':
+			return self.directory + 'dead.png'
+		return self.directory + species + '/' + species + str(age) + self.POSES[pose]
+
+	def get(self, species, age, pose='', size=300):
+		"""
+		Returns a QMovie for the gif poses and a QPixmap for the others,
+		scaled to size x size.
+		"""
+		key = (species, age, pose, size)
+		sprite = self.sprites.get(key)
+		if sprite is not None:
+			self.sprites.move_to_end(key)
+			return sprite
+
+		sprite = self.load(self.path(species, age, pose), size)
+		self.sprites[key] = sprite
+		#forget the least recently used sprite once the cache is full
+		if len(self.sprites) > self.max_size:
+			self.sprites.popitem(last=False)
+		return sprite
+
+	def load(self, path, size):
+		start = metrics.start()
+		if path.endswith('.gif'):
+			sprite = QtGui.QMovie(path)
+			#keep the decoded frames so the gif is only decoded once
+			sprite.setCacheMode(QtGui.QMovie.CacheAll)
+			sprite.setScaledSize(QtCore.QSize(size, size))
+			sprite.setSpeed(self.speed)
+		else:
+			sprite = QtGui.QPixmap(path).scaled(size, size)
+		metrics.stop('sprite load', start)
+		return sprite
+
+	def set_speed(self, speed):
+		"""
+		Plays every gif at speed percent of its normal speed.
+		"""
+		self.speed = speed
+		for sprite in set(self.sprites.values()) | set(self.playing):
+			if isinstance(sprite, QtGui.QMovie):
+				sprite.setSpeed(speed)
+
+	def play(self, movie):
+		"""
+		Starts a gif that one more window is showing.
+		"""
+		self.playing[movie] = self.playing.get(movie, 0) + 1
+		if self.playing[movie] == 1:
+			movie.start()
+
+	def pause(self, movie):
+		"""
+		Stops a gif once the last window showing it stops showing it.
+		"""
+		if movie not in self.playing:
+			return
+		self.playing[movie] -= 1
+		if not self.playing[movie]:
+			del self.playing[movie]
+			movie.stop()
+
+	def dead(self, size=300):
+		return self.get(None, 0, 'dead', size)
+
+	def warm(self, species, ages=(1, 2, 3), size=300):
+		"""
+		Loads every pose of a species ahead of time.
+		"""
+		for age in ages:
+			for pose in self.POSES:
+				self.get(species, age, pose, size)
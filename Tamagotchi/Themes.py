@@ -0,0 +1,63 @@
+from PyQt5 import QtCore
+from PyQt5.QtWidgets import QApplication
+from glob import glob
+import os
+
+from Metrics import metrics
+
+
+class ThemeRegistry():
+	"""
+	Reads every theme in the styles folder once and applies the
+	selected one to the whole application.
+	Watches the folder so edited themes are picked up without a restart.
+	"""
+	def __init__(self, directory='./styles/'):
+		self.directory = directory
+		self.themes = {}
+		self.current = None
+
+		self.watcher = QtCore.QFileSystemWatcher()
+		self.watcher.addPath(directory)
+		for path in sorted(glob(directory + '*.css')):
+			self.load(path)
+		self.watcher.fileChanged.connect(self.file_changed)
+		self.watcher.directoryChanged.connect(self.directory_changed)
+
+	def names(self):
+		return list(self.themes)
+
+	def load(self, path):
+		"""
+		Reads a theme and watches its file for changes.
+		"""
+		with open(path) as file:
+			self.themes[os.path.basename(path)[:-4]] = file.read()
+		if path not in self.watcher.files():
+			self.watcher.addPath(path)
+
+	def apply(self, name, force=False):
+		"""
+		Sets the theme as the stylesheet of the whole application,
+		nothing is restyled if the theme is already applied.
+		"""
+		if name == self.current and not force:
+			return
+		start = metrics.start()
+		QApplication.instance().setStyleSheet(self.themes[name])
+		metrics.stop('stylesheet', start)
+		self.current = name
+
+	def file_changed(self, path):
+		#editors that save by replacing the file remove it for a moment
+		if not os.path.exists(path):
+			return
+		self.load(path)
+		if os.path.basename(path)[:-4] == self.current:
+			self.apply(self.current, force=True)
+
+	def directory_changed(self, directory):
+		#picks up new themes and themes that were saved by replacing the file
+		for path in glob(self.directory + '*.css'):
+			if path not in self.watcher.files():
+				self.file_changed(path)
@@ -1,94 +1,86 @@
 from PyQt5.QtCore import QThread, pyqtSignal #import all of the threading related classes and methods.
 import sys, time #Sys used with the pyqt5 library and time is used in the threading modules.
 
+from Scheduler import Scheduler
+from Metrics import metrics
+
 
 
 class Update(QThread):
 
 	"""
-	A class purely for managing the
-	threading behind changing values for the 
-	tamagotchis health, hunger and happines over time.
+	The one thread that keeps time for every tamagotchi.
+	It emits ticked with the clock on the next tick where a tamagotchi
+	has something happen, and each Game window advances its own
+	tamagotchi up to it, so the number of threads stays the same however
+	many tamagotchis are running and idle ticks don't wake anything.
 	"""
-	countChanged = pyqtSignal(int)
+	ticked = pyqtSignal(int)
 	
-	def __init__(self, parent, tamagotchi):
-		super().__init__()
-
-		self.parent = parent
-		self.tamagotchi = tamagotchi
-
-
-
-	def run(self):
-		clock = 1
-		while not self.tamagotchi.dead:
-			"""
-			Main loop that runs while the tamagotchi is not dead.
-			"""
-			time.sleep(0.1)
-			#The integer that is emitted refers to a task to be run.
-			if not clock % 2:
-				self.countChanged.emit(1)
-			if not clock % 3:
-				self.countChanged.emit(2)
-			if not clock % 5:
-				self.countChanged.emit(0)
-
-			if not clock % 200:
-				self.countChanged.emit(5)
-
-			if not clock % 250:
-				self.countChanged.emit(6)
-
-			if not clock % 600:
-				self.countChanged.emit(3)
-
-			clock += 1
-			
-class Sleeping(QThread):
-
-	"""
-	A thread that only runs while the tamagotchi is sleeping.
-	"""
-
-	sleeping = pyqtSignal(int)
-
-	def __init__(self, parent, tamagotchi):
+	def __init__(self, parent):
 		super().__init__()
 
 		self.parent = parent
-		self.tamagotchi = tamagotchi
+		self.scheduler = Scheduler()
+		#the windows say when they next need a tick with wake_at
+		self.job = None
+		#how many seconds late the last tick was handled, and the most it has been
+		self.lag = 0.0
+		self.max_lag = 0.0
 
-	
-	def run(self):
-		#Loop of events to occur while the tamagotchi is sleeping.
-		for clock in range(1, 51):
-			if not clock % 10:
-				self.sleeping.emit(2)
-			if not clock % 5:
-				self.sleeping.emit(0)
-			time.sleep(0.1)
-		self.sleeping.emit(3)
-
-
-class Sick(QThread):
-
-	"""
-	A thread that only runs while the tamagotchi is sick.
-	"""
-
-	sick = pyqtSignal(int)
-
-	def __init__(self, parent, tamagotchi):
-		super().__init__()
-
-		self.parent = parent
-		self.tamagotchi = tamagotchi
 
 	def run(self):
-		#Loop of events that run while the tamagotchi is sick.
-		while not self.tamagotchi.medicine_pressed and self.tamagotchi.sick:
-			self.sick.emit(1)
-			time.sleep(1)
-		self.sick.emit(2)
\ No newline at end of file
+		self.scheduler.run()
+
+	def now(self):
+		return self.scheduler.now()
+
+	def wake_at(self, clock):
+		"""
+		Emits ticked next on the tick, or not until wake_at is called again if clock is None.
+		"""
+		if self.job is not None:
+			self.job.cancel()
+		self.job = None if clock is None else self.scheduler.at(clock, self.emit)
+
+	def measure_lag(self, clock):
+		"""
+		Records how far behind its deadline the tick is being handled.
+		"""
+		self.lag = self.scheduler.lag(clock)
+		self.max_lag = max(self.max_lag, self.lag)
+		if metrics.enabled:
+			metrics.set('tick lag s', self.lag)
+			metrics.set('max tick lag s', self.max_lag)
+			metrics.record('tick lag', self.lag)
+
+	def emit(self, clock):
+		if metrics.enabled:
+			metrics.count('ticked emitted')
+		self.ticked.emit(clock)
+
+	def set_speed(self, speed):
+		self.scheduler.set_speed(speed)
+
+	def step(self):
+		self.scheduler.step()
+
+	def seconds(self, ticks):
+		"""
+		Returns how many seconds the ticks take at the current speed.
+		"""
+		scheduler = self.scheduler
+		return 0 if scheduler.speed is None else ticks * scheduler.tick_length / scheduler.speed
+
+	def pause(self):
+		self.scheduler.pause()
+
+	def resume(self):
+		self.scheduler.resume()
+
+	def stop(self):
+		"""
+		Cancels the scheduler and waits for the thread to finish.
+		"""
+		self.scheduler.cancel()
+		self.wait()
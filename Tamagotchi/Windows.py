@@ -1,11 +1,23 @@
 from PyQt5 import QtCore, QtGui #General import for creating and managing user interface elements.
-from PyQt5.QtWidgets import * #Used to import all of the widgets such as buttons, labels etc.
-import sys, time #Sys used with the pyqt5 library and time is used in the threading modules.
-from glob import glob #Glob library used for finding the files.
-from random import choice
-from os import remove
+#The widgets such as buttons, labels etc.
+from PyQt5.QtWidgets import (QMainWindow, QWidget, QLabel, QPushButton, QComboBox, QProgressBar,
+	QInputDialog, QMessageBox, QVBoxLayout, QHBoxLayout, QGridLayout)
+from Engine import Engine
+from Metrics import metrics
 
-from Threads import Update, Sleeping, Sick
+#The speeds the game can run at, None runs it as fast as it can.
+SPEEDS = [('1x', 1), ('10x', 10), ('100x', 100), ('Unbounded', None)]
+
+#How many times a second a Game window redraws the stats and countdowns at most, however fast the game runs.
+FRAME_RATE = 30
+
+#(widget, projected event, tooltip) for the countdowns Game shows.
+PROJECTION_TIPS = [
+	('progress_health', 'dead', 'Dies in %.0f seconds'),
+	('progress_hunger', 'hungry', 'Starving in %.0f seconds'),
+	('progress_happiness', 'unhappy', 'Unhappy in %.0f seconds'),
+	('label_name', 'aged', 'Grows up in %.0f seconds'),
+]
 
 
 class MainMenu(QMainWindow):
@@ -14,7 +26,7 @@ class MainMenu(QMainWindow):
 	The Main Menu of the Application.
 	"""
 
-	def __init__(self, parent, tamagotchi):
+	def __init__(self, parent):
 
 		"""
 		Initialise the window with correct sizing and titles.
@@ -26,12 +38,7 @@ class MainMenu(QMainWindow):
 		self.setWindowTitle('Tamagotchi - Main Menu')
 		self.setWindowIcon(QtGui.QIcon('./img/icon.png'))
 
-		self.tamagotchi = tamagotchi
-		
-		with open('./styles/' + self.tamagotchi.style_name + '.css') as file:
-			css = file.read()
-			self.setStyleSheet(css)
-		self.tamagotchi.style_sheet = css
+		self.parent = parent
 
 		
 		"""
@@ -51,10 +58,9 @@ class MainMenu(QMainWindow):
 
 		#Style selector dropdown
 		self.styles_button = QComboBox(self)
-		THEMES = ['Dark Theme', 'Light Theme', 'Pink Theme']
-		self.styles_button.addItem(self.tamagotchi.style_name)
-		for theme in THEMES:
-			if theme != self.tamagotchi.style_name:
+		self.styles_button.addItem(self.parent.themes.current)
+		for theme in self.parent.themes.names():
+			if theme != self.parent.themes.current:
 				self.styles_button.addItem(theme)
 		self.styles_button.activated[str].connect(self.select_style)
 
@@ -97,8 +103,7 @@ class MainMenu(QMainWindow):
 		self.save_files = QComboBox(self)
 		self.save_files.setFixedWidth(150)
 		self.save_files.clear()
-		for file in glob('./saves/*.TAMA'):
-			self.save_files.addItem(file[8:-5])
+		self.save_files.addItems(self.parent.game_names())
 		
 
 		
@@ -114,25 +119,33 @@ class MainMenu(QMainWindow):
 
 		fileName = self.save_files.currentText()
 		if fileName:
-			with open('./saves/' + fileName + '.TAMA', 'r') as f:
-				contents = f.read().split('\n')
-				self.tamagotchi.start_game(*contents)
+			journals = self.parent.journals
+			contents = None
+			try:
+				try:
+					contents = self.parent.saves.load(fileName)
+				except (ValueError, OSError):
+					#a tamagotchi with a damaged save or none at all can still carry on from its journal
+					if not journals.contains(fileName):
+						raise
+				#the tamagotchi carries on from its journal unless the save was written after it, by the server say
+				if journals.contains(fileName) and (contents is None or contents[7] is None or journals.modified(fileName) >= contents[7]):
+					self.parent.recover_game(fileName)
+					return
+			except (ValueError, OSError) as error:
+				QMessageBox.warning(self, 'Tamagotchi', 'Could not load ' + fileName + ': ' + str(error))
+				return
+			self.parent.start_game(*contents)
 					
 
 	def select_style(self, style):
 
 		"""
 		Allows the user to make the users selected
-		css style take effect in the window.
+		css style take effect in the application.
 		"""
 
-		self.setStyleSheet('')
-		with open('./styles/' + style + '.css') as file:
-			css = file.read()
-			self.setStyleSheet(css)
-
-			self.tamagotchi.style_name = style
-			self.tamagotchi.style_sheet = css
+		self.parent.themes.apply(style)
 					
 	def new_game(self):
 
@@ -144,7 +157,7 @@ class MainMenu(QMainWindow):
 		style_name = self.styles_button.currentText()
 		text, valid = QInputDialog.getText(self, 'Tamagotchi Input Dialog', 'Enter your Tamagotchi name:')
 		if valid and text:
-			self.tamagotchi.start_game(text, 100, 100, 100, style_name, 1)
+			self.parent.start_game(text, 100, 100, 100, style_name, 1)
 
 
 class Game(QMainWindow):
@@ -152,6 +165,9 @@ class Game(QMainWindow):
 	The Game class contains the main window of the tamagotchi game.
 	"""
 
+	#Emitted from the save writer's thread once a save has been written.
+	saved = QtCore.pyqtSignal(bool)
+
 	def __init__(self, parent, tamagotchi):
 
 		"""
@@ -163,6 +179,8 @@ class Game(QMainWindow):
 
 		self.tamagotchi = tamagotchi
 		self.parent = parent
+		#the clock tick the tamagotchi has been advanced to
+		self.last_tick = 0
 
 		self.setFixedSize(750, 600)
 		self.setWindowTitle('Tamagotchi')
@@ -182,8 +200,18 @@ class Game(QMainWindow):
 		self.medicine = QPushButton('Medicine')
 		self.sleep = QPushButton('Sleep')
 
+		#Debug controls for running the game faster or a tick at a time.
+		self.speed = QComboBox()
+		self.speed.addItems([name for name, speed in SPEEDS])
+		self.step_tick = QPushButton('Step')
+		self.show_metrics = QPushButton('Metrics')
+		self.show_metrics.setCheckable(True)
+
 		main_menu.setToolTip('Return to the main menu.')
 		self.save_game.setToolTip('Automatically save the current tamagotchi.')
+		self.speed.setToolTip('How fast every tamagotchi runs.')
+		self.step_tick.setToolTip('Pause every tamagotchi and advance them by one tick.')
+		self.show_metrics.setToolTip('Record where the time goes and show it over the tamagotchi.')
 
 		#Create window layout
 		win = QWidget()
@@ -196,6 +224,9 @@ class Game(QMainWindow):
 		top_row.addWidget(self.save_game)
 		top_row.addWidget(self.discipline)
 		top_row.addWidget(self.duck)
+		top_row.addWidget(self.speed)
+		top_row.addWidget(self.step_tick)
+		top_row.addWidget(self.show_metrics)
 
 		grid.addLayout(top_row)
 
@@ -236,6 +267,20 @@ class Game(QMainWindow):
 		bar_layout.addWidget(self.status)
 
 
+		#The metrics overlay sits over the sprite and is refreshed while it shows.
+		self.metrics_overlay = QLabel(self.img)
+		self.metrics_overlay.setFont(QtGui.QFont('Ariel', 8))
+		self.metrics_overlay.hide()
+		self.metrics_timer = QtCore.QTimer(self)
+		self.metrics_timer.setInterval(500)
+		self.metrics_timer.timeout.connect(self.refresh_metrics)
+
+		#Changes to the stats start a frame, and everything that changed before it is drawn in one go.
+		self.frame_timer = QtCore.QTimer(self)
+		self.frame_timer.setSingleShot(True)
+		self.frame_timer.timeout.connect(self.render)
+		self.set_frame_rate(FRAME_RATE)
+
 		middle_row.addWidget(self.img)
 		middle_row.addLayout(bar_layout)
 		#grid.addLayout(bar_layout, 1, 2, 1, 2)
@@ -254,16 +299,21 @@ class Game(QMainWindow):
 		#Define button on-click events
 		main_menu.clicked.connect(self.menu_button)
 		self.save_game.clicked.connect(self.save_current_game)
+		self.saved.connect(self.onSaved)
 
 		
-		self.medicine.clicked.connect(lambda: self.onSick(2))
-		self.feed.clicked.connect(lambda: self.update_stats('hunger', self.progress_hunger, 10))
-		self.game.clicked.connect(lambda: self.parent.frames[HappinessGame].layout())
+		self.medicine.clicked.connect(self.give_medicine)
+		self.feed.clicked.connect(self.feed_pet)
+		self.game.clicked.connect(lambda: self.parent.window(HappinessGame).layout(self))
 		self.sleep.clicked.connect(self.change_lights)
 
 		self.duck.clicked.connect(self.clean_tamagotchi)
 		self.discipline.clicked.connect(self.discipline_tamagotchi)
 
+		self.speed.activated.connect(lambda index: self.parent.set_speed(SPEEDS[index][1]))
+		self.step_tick.clicked.connect(self.parent.step)
+		self.show_metrics.toggled.connect(self.parent.set_metrics)
+
 
 		self.progress_health.setMaximum(100)
 
@@ -275,29 +325,28 @@ class Game(QMainWindow):
 		self.progress_happiness.setMaximum(100)
 		self.progress_happiness.setTextVisible(False)
 
+		#The bars follow the tamagotchi's stats as they change.
+		self.bars = [self.progress_health, self.progress_hunger, self.progress_happiness]
+		self.tamagotchi.stats.listen(self.stat_changed)
 
-	def init_stats(self):
+
+	def init_stats(self, engine=None):
 
 		"""
 		Sets the variables of the game window.
 		Is used when reopening the game window to reset the stats.
+		engine is the tamagotchi's engine if it has already been set up.
 		"""
 
-		#opens the selected stylesheet and sets the style to it.
-		with open('./styles/' + self.tamagotchi.style_name + '.css') as file:
-			css = file.read()
-			self.setStyleSheet(css)
+		#sets the style to the tamagotchi's theme.
+		self.parent.themes.apply(self.tamagotchi.style_name)
 
-		gif = QtGui.QMovie(self.tamagotchi.DIRECTORY + str(self.tamagotchi.age) + '.gif')
-		gif.setScaledSize(QtCore.QSize().scaled(300, 300, QtCore.Qt.KeepAspectRatio))
-		self.img.setMovie(gif)
-		gif.start()
+		self.engine = engine if engine is not None else Engine(self.tamagotchi)
+		self.set_sprite('')
 
 		#resest all of the stats for either save file or new tamagotchi
 		self.label_name.setText(self.tamagotchi.name)
-		self.progress_health.setValue(int(self.tamagotchi.health))
-		self.progress_hunger.setValue(int(self.tamagotchi.hunger))
-		self.progress_happiness.setValue(int(self.tamagotchi.happiness))
+		self.refresh_stats()
 
 		self.disable_enable_buttons(True)
 		self.save_game.setEnabled(True)
@@ -306,13 +355,125 @@ class Game(QMainWindow):
 
 		self.discipline.setEnabled(False)
 		self.duck.setEnabled(False)
-		#self.new_stats.start()
+
+		#a save can be of a sick tamagotchi, and a journal of one that is asleep or needs looking after too
+		if self.tamagotchi.sick:
+			self.getting_sick()
+		if self.tamagotchi.sleeping:
+			self.show_events(['asleep'])
+		if self.tamagotchi.needs_discipline:
+			self.show_events(['discipline'])
+		if self.tamagotchi.needs_cleaning:
+			self.show_events(['cleaning'])
+		self.show_projection()
+
+	def refresh_stats(self):
+		"""
+		Shows the tamagotchi's current stats on the progress bars.
+		"""
+		if metrics.enabled:
+			metrics.count('update_stats')
+		for stat, value in enumerate(self.tamagotchi.stats.values):
+			if self.bars[stat].value() != value:
+				self.bars[stat].setValue(value)
+
+	def stat_changed(self, stat, value):
+		self.request_frame()
+
+	def set_frame_rate(self, rate):
+		self.frame_timer.setInterval(int(1000 / rate))
+
+	def request_frame(self):
+		"""
+		Draws the window on the next frame, if one isn't already coming.
+		"""
+		if not self.frame_timer.isActive():
+			self.frame_timer.start()
+
+	def render(self):
+		"""
+		Draws the latest stats and countdowns, only changing the widgets that are out of date.
+		"""
+		start = metrics.start()
+		self.refresh_stats()
+		self.show_projection()
+		metrics.stop('game frame', start)
+
+	def metrics_shown(self, shown):
+		"""
+		Shows or hides the metrics overlay.
+		"""
+		self.show_metrics.setChecked(shown)
+		self.metrics_overlay.setVisible(shown)
+		if shown:
+			self.refresh_metrics()
+			self.metrics_timer.start()
+		else:
+			self.metrics_timer.stop()
+
+	def refresh_metrics(self):
+		self.metrics_overlay.setText(metrics.summary())
+		self.metrics_overlay.adjustSize()
+
+	def set_sprite(self, pose):
+		"""
+		Changes the tamagotchi's sprite to the pose for its age.
+		"""
+		self.show_sprite(self.parent.sprites.get(self.tamagotchi.species, self.tamagotchi.age, pose))
+
+	def show_sprite(self, sprite):
+		showing = self.img.movie()
+		if sprite is showing:
+			return
+		#the gif that was showing stops unless another window is showing it too
+		if showing is not None:
+			self.parent.sprites.pause(showing)
+		if isinstance(sprite, QtGui.QMovie):
+			self.img.setMovie(sprite)
+			self.parent.sprites.play(sprite)
+		else:
+			self.img.setPixmap(sprite)
+
+	def show_events(self, events):
+		"""
+		Updates the window to show the events returned by the engine.
+		"""
+		for event in events:
+			if event == 'sick':
+				self.getting_sick()
+			elif event == 'cured':
+				self.cured()
+			elif event == 'dead':
+				self.dead_tamagotchi()
+			elif event == 'aged':
+				#change the sprite of the tamagotchi to an older version of it
+				self.set_sprite('')
+			elif event == 'asleep':
+				self.set_sprite('Sleep')
+				self.disable_enable_buttons(False)
+				#the lights can be turned back on while it sleeps
+				self.sleep.setText('Wake')
+				self.sleep.setEnabled(True)
+			elif event == 'awake':
+				self.set_sprite('')
+				self.sleep.setText('Sleep')
+				self.disable_enable_buttons(True)
+			elif event == 'discipline':
+				self.status.setText(self.tamagotchi.name.strip() + ' needs Disciplining')
+				self.discipline.setEnabled(True)
+				#the engine only allows cleaning, disciplining and waking it up
+				self.disable_enable_buttons(True)
+			elif event == 'cleaning':
+				self.status.setText(self.tamagotchi.name.strip() + ' needs Cleaning')
+				self.duck.setEnabled(True)
+				self.disable_enable_buttons(True)
 
 	def clean_tamagotchi(self):
 		"""
 		cleans the tamagotchi
 		"""
-		self.tamagotchi.needs_cleaning = False
+		self.parent.user_action(self, 'clean')
+		self.engine.clean()
 		#if the tamagotchi still needs disciplinng change the stats to disciplining
 		if self.tamagotchi.needs_discipline == True:
 			self.status.setText(self.tamagotchi.name.strip()+' needs Disciplining')
@@ -328,7 +489,8 @@ class Game(QMainWindow):
 		"""
 		disciplines the tamagotchi
 		"""
-		self.tamagotchi.needs_discipline = False
+		self.parent.user_action(self, 'discipline')
+		self.engine.discipline()
 		#if the tamagotchi still needs cleaning change the stats to cleaning
 		if self.tamagotchi.needs_cleaning == True:
 			self.status.setText(self.tamagotchi.name.strip()+' needs Cleaning')
@@ -343,149 +505,92 @@ class Game(QMainWindow):
 		
 
 	def disable_enable_buttons(self, state):
-		self.sleep.setEnabled(state)
-		self.game.setEnabled(state)
-		self.feed.setEnabled(state)
-		self.medicine.setEnabled(state)
+		#only the actions the engine allows right now are enabled
+		engine = self.engine
+		self.sleep.setEnabled(state and engine.allowed('wake' if self.tamagotchi.sleeping else 'sleep'))
+		self.game.setEnabled(state and engine.allowed('start_play'))
+		self.feed.setEnabled(state and engine.allowed('feed'))
+		self.medicine.setEnabled(state and engine.allowed('medicine'))
 
 
-	def change_lights(self):
+	def feed_pet(self):
+		self.parent.user_action(self, 'feed')
+		self.show_events(self.engine.feed())
+
+	def give_medicine(self):
 		"""
-		changes the tamagotchi gif to sleeping or awake
-		starts the Sleeping thread
+		Cures the tamagotchi, the damage stops straight away.
 		"""
+		#brought up to now first so it is cured on the tick the button was pressed
+		self.parent.user_action(self, 'medicine')
+		self.show_events(self.engine.medicine())
+		#the clock doesn't wake up for the sickness any more
+		self.parent.reschedule()
 
-		if not self.tamagotchi.sleeping:
-
-			gif = QtGui.QMovie(self.tamagotchi.DIRECTORY + str(self.tamagotchi.age) + '-Sleep.gif')
-			gif.setScaledSize(QtCore.QSize().scaled(300, 300, QtCore.Qt.KeepAspectRatio))
-			self.img.setMovie(gif)
-			gif.start()
-			self.disable_enable_buttons(False)
-			self.parent.threads[Sleeping].start()
-
+	def change_lights(self):
+		"""
+		Turns the lights off to put the tamagotchi to sleep, or back on to wake it up early.
+		The engine wakes it up by itself once it has slept.
+		"""
+		was_sleeping = self.tamagotchi.sleeping
+		self.parent.user_action(self, 'lights')
+		if was_sleeping:
+			self.show_events(self.engine.wake())
 		else:
-			gif = QtGui.QMovie(self.tamagotchi.DIRECTORY + str(self.tamagotchi.age) + '.gif')
-			gif.setScaledSize(QtCore.QSize().scaled(300, 300, QtCore.Qt.KeepAspectRatio))
-			self.img.setMovie(gif)
-			gif.start()
-		
-		self.tamagotchi.sleeping = not self.tamagotchi.sleeping
+			self.show_events(self.engine.sleep())
+		#the clock wakes up for the sleep schedule only while it sleeps
+		self.parent.reschedule()
 
 	def getting_sick(self):
 		"""
-		the tamagotch doesnt get sick till it wakes up
 		sets the sprite to the sick tamagotchi sprite
 		"""
-		
-		if not self.tamagotchi.sleeping:
-
-			self.tamagotchi.sick = True
-			self.status.setText(self.tamagotchi.name.strip() + ' needs medicine.')
-			pixmap = QtGui.QPixmap(self.tamagotchi.DIRECTORY + str(self.tamagotchi.age) + '-Sick.png').scaled(300, 300)
-			self.img.setPixmap(pixmap)
-			#disables all buttons excepet for medicine
-			self.sleep.setEnabled(False)
-			self.game.setEnabled(False)
-			self.medicine.setEnabled(True)
-			self.parent.threads[Sick].start()
+		self.status.setText(self.tamagotchi.name.strip() + ' needs medicine.')
+		self.set_sprite('Sick')
+		#disables all buttons excepet for medicine
+		self.sleep.setEnabled(False)
+		self.game.setEnabled(False)
+		self.medicine.setEnabled(True)
 
-
-	def onSleep(self, value):
+	def cured(self):
 		"""
-		increases the tamagotchi's health and stops the health and hunger from changing
+		enables the buttons again and changes back to the normal sprite
 		"""
+		self.disable_enable_buttons(True)
+		self.status.setText('')
+		self.set_sprite('')
 
-		bars = [self.progress_health, self.progress_hunger, self.progress_happiness]
-		stats = ['health', 'hunger', 'happiness']
-
-		if value == 0:
-			self.update_stats(stats[value], bars[value], 5)
-
-		elif value == 2:
-			self.update_stats(stats[value], bars[value], 1)
 
-		elif value == 3:
-			self.change_lights()
-			self.disable_enable_buttons(True)
+	def onTick(self, clock):
 
-	def onSick(self, value):
 		"""
-		when the tamagotchi is sick he health and happiness of the tamagotchi decrease faster
-		and eneables the medicin button
+		A method for the game class that is controlled by the Update thread.
+		Advances the tamagotchi up to the clock, skipping the ticks where nothing happens.
 		"""
-		if value == 1:
-			self.update_stats('health', self.progress_health, -5)
-			self.update_stats('happiness', self.progress_happiness, -3)
-			
-		if value == 2 and not self.tamagotchi.dead:
-			self.sleep.setEnabled(True)
-			self.game.setEnabled(True)
-			self.tamagotchi.sick = False
-			self.tamagotchi.medicine_pressed = True
-			self.status.setText('')
-			self.update_stats('hunger', self.progress_hunger, 20)
-			self.update_stats('happiness', self.progress_happiness, 20)
-			self.tamagotchi.medicine_pressed = False
-			gif = QtGui.QMovie(self.tamagotchi.DIRECTORY + str(self.tamagotchi.age) + '.gif')
-			gif.setScaledSize(QtCore.QSize().scaled(300, 300, QtCore.Qt.KeepAspectRatio))
-			self.img.setMovie(gif)
-			gif.start()
-
+		if clock <= self.last_tick:
+			return
+		start = metrics.start()
+		ticks = clock - self.last_tick
+		self.last_tick = clock
+		self.show_events(self.engine.advance(ticks))
 
-	def onCountChanged(self, value):
+		if not self.tamagotchi.sick and not self.tamagotchi.playing_with_pet:
+			self.medicine.setEnabled(False)
+		#the countdowns change every tick, so they wait for the next frame too
+		self.request_frame()
+		metrics.stop('game tick', start)
 
+	def show_projection(self):
 		"""
-		A method for the game class that is controlled by the StatChange class.
-		This method is called periodically throughout the running of the code.
+		Shows how long until each stat runs out and the tamagotchi grows up
+		as the tooltips of the bars and its name.
 		"""
-
-		if self.tamagotchi.playing_with_pet:
-			return
-
-		bars = [self.progress_health, self.progress_hunger, self.progress_happiness]
-		stats = ['health', 'hunger', 'happiness']
-
-		if value < 3:
-			self.update_stats(stats[value], bars[value], -1)
-
-			for bar in bars[1:]:
-				if bar.value() <= 0:
-
-					self.getting_sick()
-
-			if self.progress_health.value() <= 0:
-
-				self.tamagotchi.dead = True
-				self.dead_tamagotchi()
-
-			if not self.tamagotchi.sick:
-				self.medicine.setEnabled(False)
-
-		#if the age of the tamagotchi is above 3 so it has aged past old age it dies
-		if value == 3:
-			self.tamagotchi.age += 1
-			if self.tamagotchi.age > 3:
-				self.tamagotchi.dead = True
-				self.dead_tamagotchi()
-			#change the sprite of the tamagotchi to an older version of it
-			else:
-				gif = QtGui.QMovie(self.tamagotchi.DIRECTORY + str(self.tamagotchi.age) + '.gif')
-				gif.setScaledSize(QtCore.QSize().scaled(300, 300, QtCore.Qt.KeepAspectRatio))
-				self.img.setMovie(gif)
-				gif.start()
-
-		if value == 5 and self.tamagotchi.sick == False:
-			self.status.setText(self.tamagotchi.name.strip() + ' needs Disciplining')
-			self.tamagotchi.needs_discipline = True
-			self.discipline.setEnabled(True)
-			self.disable_enable_buttons(False)
-
-		if value == 6 and self.tamagotchi.sick == False and self.tamagotchi.sleeping == False:
-			self.status.setText(self.tamagotchi.name.strip() + ' needs Cleaning')
-			self.tamagotchi.needs_cleaning = True
-			self.duck.setEnabled(True)
-			self.disable_enable_buttons(False)
+		projection = self.engine.projection()
+		for widget, event, text in PROJECTION_TIPS:
+			tip = text % self.parent.update.seconds(projection[event]) if event in projection else ''
+			widget = getattr(self, widget)
+			if widget.toolTip() != tip:
+				widget.setToolTip(tip)
 
 
 
@@ -494,41 +599,38 @@ class Game(QMainWindow):
 		"""
 		Method is called when the user presses the button to
 		go back to the main menu.
+		The tamagotchi keeps running so another one can be started.
 		"""
 		#reloads all of the save files
-		self.parent.frames[MainMenu].save_files.clear()
-		for file in glob('./saves/*.TAMA'):
-			self.parent.frames[MainMenu].save_files.addItem(file[8:-5])
+		self.parent.window(MainMenu).save_files.clear()
+		self.parent.window(MainMenu).save_files.addItems(self.parent.game_names())
 		self.parent.show_window(MainMenu)
-		self.parent.threads[Update].quit()
-		self.hide()
-
-
-	def update_stats(self, stat, bar, amount):
 
+	def closeEvent(self, event):
 		"""
-		Method called whenever the user presses either
-		of the happines, hunger or health button.
+		stops the tamagotchi when its window is closed
 		"""
-		#if the increase is above 100 it sets the amount to 100
-		if bar.value() + amount >= 100:
-			amount = 100
-		else:
-			amount = bar.value() + amount
-		bar.setValue(amount)
-		exec('self.tamagotchi.' + stat + ' = str(bar.value())')
-		
+		self.parent.user_action(self, 'close')
+		self.parent.remove_game(self)
+		#everything up to now is written so the tamagotchi can carry on from it
+		self.parent.journals.close(self.tamagotchi.name)
+		if self.img.movie() is not None:
+			self.parent.sprites.pause(self.img.movie())
+			self.img.clear()
+
 
 	def save_current_game(self):
 		"""
-		Saves the current game file.
+		Queues the current game to be saved without waiting for the file to be written.
 		"""
-		self.status.setText('File has been saved!')
-		self.save_game.setToolTip('File has been saved!')
-		saved_contents = self.tamagotchi.name+'\n'+self.tamagotchi.health+'\n'+self.tamagotchi.hunger+'\n'+self.tamagotchi.happiness+'\n'+self.tamagotchi.style_name+'\n'+str(self.tamagotchi.age)
+		self.parent.user_action(self, 'save')
+		future = self.parent.saves.save(self.tamagotchi)
+		future.add_done_callback(lambda future: self.saved.emit(future.exception() is None))
 
-		with open('saves/'+self.tamagotchi.name+'.TAMA', 'w') as file:
-			file.write(saved_contents)
+	def onSaved(self, success):
+		text = 'File has been saved!' if success else 'File could not be saved.'
+		self.status.setText(text)
+		self.save_game.setToolTip(text)
 
 
 	def dead_tamagotchi(self):
@@ -537,27 +639,27 @@ class Game(QMainWindow):
 		disables all buttons except for main menu
 		delete the tamagotchi's save file
 		"""
-		pixmap = QtGui.QPixmap('./img/dead.png').scaled(300, 300)
 		self.status.setText(self.tamagotchi.name.strip() + ' has died')
-		self.img.setPixmap(pixmap)
+		self.show_sprite(self.parent.sprites.dead())
 		self.disable_enable_buttons(False)
 		self.discipline.setEnabled(False)
 		self.duck.setEnabled(False)
 		self.save_game.setEnabled(False)
-		if self.tamagotchi.name in [file[8:-5] for file in glob('./saves/*.TAMA')]:
-			remove('./saves/' + self.tamagotchi.name + '.TAMA')
+		self.parent.saves.delete(self.tamagotchi.name)
+		self.parent.journals.delete(self.tamagotchi.name)
+		self.parent.remove_game(self)
 
 
 class HappinessGame(QMainWindow):
 	"""
 	this class contains the happiness mini game
 	"""
-	def __init__(self, parent, tamagotchi):
+	def __init__(self, parent):
 
 		super().__init__()
 
-		self.tamagotchi = tamagotchi
 		self.parent = parent
+		self.current_game = None
 
 		#Create window layout
 		self.setFixedSize(500, 400)
@@ -592,34 +694,33 @@ class HappinessGame(QMainWindow):
 
 		
 
-	def layout(self):
+	def layout(self, game):
 
 		"""
 		Chnages the layout of the happiness game window
 		and chooses a direction for the tamagotchi to move
 		"""
-		self.parent.hide_window(Game)
+		#only one tamagotchi can play at a time
+		if self.current_game is not game:
+			self.finish_game(False)
+		self.current_game = game
+		tamagotchi = game.tamagotchi
+
+		game.hide()
 		self.guess_left.setEnabled(True)
 		self.guess_right.setEnabled(True)
 		self.confirm.setEnabled(False)
 		self.won_game = False
-		self.tamagotchi.playing_with_pet = True
-		
-
-		with open('./styles/' + self.tamagotchi.style_name + '.css') as file:
-			css = file.read()
-			self.setStyleSheet(css)
+		self.parent.user_action(game, 'play')
+		game.engine.start_play()
 
-		self.random = choice([0,1])
+		#the choices come from one seeded generator so a recorded session plays out the same
+		self.random = self.parent.random.choice([0,1])
 		#sets the sprite of the tamagotchi to the direction chosen
-		if self.random == 0:
-			pixmap = QtGui.QPixmap(self.tamagotchi.DIRECTORY + str(self.tamagotchi.age) + '-Left.png').scaled(300, 300)
-			self.img.setPixmap(pixmap)
-		elif self.random == 1:
-			pixmap = QtGui.QPixmap(self.tamagotchi.DIRECTORY + str(self.tamagotchi.age) + '-Right.png').scaled(300, 300)
-			self.img.setPixmap(pixmap)
-
-		self.parent.frames[Game].disable_enable_buttons(False)
+		pose = ['Left', 'Right'][self.random]
+		self.img.setPixmap(self.parent.sprites.get(tamagotchi.species, tamagotchi.age, pose))
+
+		game.disable_enable_buttons(False)
 		self.hide()
 		self.show()
 
@@ -630,6 +731,9 @@ class HappinessGame(QMainWindow):
 		Making a direction for the tamagotchi. 1/2 times the user will be correct.
 		"""
 
+		if self.current_game is None:
+			return
+		self.parent.user_action(self.current_game, 'guess', direction)
 		self.guess_left.setEnabled(False)
 		self.guess_right.setEnabled(False)
 		self.confirm.setEnabled(True)
@@ -647,22 +751,34 @@ class HappinessGame(QMainWindow):
 		updates the happiness stat if you win
 		"""
 		self.results.setText('')
-		if self.won_game:
-			self.parent.frames[Game].update_stats("happiness", self.parent.frames[Game].progress_happiness, 50)
-
-		self.tamagotchi.playing_with_pet = False
-		self.parent.frames[Game].disable_enable_buttons(True)
-		self.parent.frames[Game].medicine.setEnabled(False)
+		if self.current_game is not None:
+			self.parent.user_action(self.current_game, 'confirm')
+		self.finish_game(self.won_game)
 		self.hide()
-		self.parent.show_window(Game)
+
+
+	def finish_game(self, won):
+		"""
+		gives the tamagotchi back to its game window and enables all the buttons
+		"""
+		game = self.current_game
+		if game is None:
+			return
+		self.current_game = None
+		#the tamagotchi was paused while it played, so it is brought up to now first
+		self.parent.sync()
+		game.show_events(game.engine.play(won))
+		self.parent.reschedule()
+		if not game.tamagotchi.dead:
+			game.disable_enable_buttons(True)
+			game.medicine.setEnabled(False)
+		game.show()
 
 
 	def closeEvent(self, event):
 		"""
 		if the user closes the happiness game window it will reopen the game window 
-		and enable all the buttons
 		"""
-		self.parent.show_window(Game)
-		self.parent.frames[Game].disable_enable_buttons(True)
-		self.parent.frames[Game].medicine.setEnabled(False)
-		self.tamagotchi.playing_with_pet = False
+		if self.current_game is not None:
+			self.parent.user_action(self.current_game, 'close_play')
+		self.finish_game(False)
@@ -0,0 +1,4 @@
+import os, sys
+
+#The game's modules sit side by side in Tamagotchi and import each other by name.
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'Tamagotchi'))
@@ -0,0 +1,71 @@
+from concurrent.futures import ProcessPoolExecutor
+from random import Random
+
+import Engine
+from Engine import Pet
+from Balance import Strategy, STRATEGIES, set_rules, lifetime, summary, simulate
+
+RULES = {'DECAY': -2, 'PERIODS': {Engine.HUNGER: 3}}
+
+
+def test_strategy_that_cannot_reach_its_thresholds_still_finishes():
+	strategy = Strategy('hopeless', feed_below=200, play_below=200, win_rate=0)
+	life = lifetime(strategy, 1)
+	assert life['lifespan'] > 0
+
+
+def ticked_sick(strategy, seed):
+	"""
+	The ticks the pet is sick for in lifetime, counted a tick at a time.
+	"""
+	random = Random(seed)
+	engine = Engine.Engine(Pet())
+	pet = engine.pet
+	sick = 0
+	sick_for = 0
+	while not pet.dead:
+		for tick in range(strategy.period):
+			if pet.dead:
+				break
+			engine.tick()
+			sick += pet.sick
+		if pet.dead:
+			break
+		sick_for = sick_for + strategy.period if pet.sick else 0
+		strategy.act(engine, sick_for, random)
+	return engine.clock, sick
+
+
+def test_sick_time_is_exact():
+	for strategy in STRATEGIES:
+		for seed in range(5):
+			life = lifetime(strategy, seed)
+			assert (life['lifespan'], life['sick']) == ticked_sick(strategy, seed), (strategy.name, seed)
+
+
+def with_rules(strategy, seeds):
+	set_rules(RULES)
+	return [lifetime(strategy, seed) for seed in seeds]
+
+
+def test_rules_are_set_in_the_workers():
+	strategy = STRATEGIES[1]
+	with ProcessPoolExecutor(1) as pool:
+		expected = summary(pool.submit(with_rules, strategy, range(20)).result())
+	assert simulate([strategy], 20, RULES, workers=2)[strategy.name] == expected
+	#this process keeps its rules
+	assert Engine.DECAY == -1 and Engine.PERIODS[Engine.HUNGER] == 2
+	assert summary([lifetime(strategy, seed) for seed in range(20)]) != expected
+
+
+def test_summary():
+	lives = [
+		{'lifespan': 100, 'old_age': False, 'sick': 50, 'health': 10, 'hunger': 20, 'happiness': 30},
+		{'lifespan': 300, 'old_age': True, 'sick': 0, 'health': 30, 'hunger': 40, 'happiness': 50},
+	]
+	result = summary(lives)
+	assert result['lives'] == 2
+	assert result['old_age'] == 0.5
+	assert result['lifespan'] == {'mean': 200, 'min': 100, 'p10': 100, 'median': 300, 'p90': 300, 'max': 300}
+	assert result['sick_fraction']['mean'] == 0.25
+	assert result['stats']['hunger']['mean'] == 30
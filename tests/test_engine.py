@@ -0,0 +1,110 @@
+import random
+
+from Engine import Pet, Engine, PROJECTED
+
+
+def random_engine(rng):
+	pet = Pet('Test', rng.choice([1, 2, rng.randint(1, 100)]), rng.choice([0, 1, rng.randint(0, 100)]),
+		rng.choice([0, 1, rng.randint(0, 100)]), 'Light Theme', rng.randint(1, 3))
+	engine = Engine(pet)
+	engine.clock = rng.choice([0, rng.randint(0, 2000)])
+	#a sick clock is left over from an earlier sickness even when the pet has been cured
+	engine.sick_clock = rng.randint(0, 30)
+	pet.sick = rng.random() < 0.3
+	pet.sleeping = rng.random() < 0.2
+	engine.sleep_clock = rng.randint(0, 49) if pet.sleeping else 0
+	return engine
+
+
+def copy(engine):
+	pet = engine.pet
+	other = Engine(Pet(pet.name, pet.health, pet.hunger, pet.happiness, pet.style_name, pet.age))
+	other.pet.sick, other.pet.sleeping = pet.sick, pet.sleeping
+	other.clock, other.sleep_clock, other.sick_clock = engine.clock, engine.sleep_clock, engine.sick_clock
+	return other
+
+
+def state(engine):
+	pet = engine.pet
+	return (list(pet.stats.values), pet.age, pet.sick, pet.dead, pet.sleeping, pet.needs_discipline, pet.needs_cleaning,
+		engine.clock, engine.sick_clock)
+
+
+def test_catch_up_matches_ticks():
+	rng = random.Random(7)
+	for trial in range(5000):
+		engine = random_engine(rng)
+		ticked = copy(engine)
+		ticks = rng.choice([rng.randint(0, 50), rng.randint(0, 3000)])
+		events = engine.catch_up(ticks)
+		ticked_events = []
+		for tick in range(ticks):
+			if ticked.pet.dead:
+				break
+			ticked_events += ticked.tick()
+		assert state(engine) == state(ticked), (trial, ticks)
+		assert set(events) == set(ticked_events), (trial, ticks)
+
+
+def test_advance_matches_ticks():
+	rng = random.Random(1)
+	for trial in range(3000):
+		engine = random_engine(rng)
+		ticked = copy(engine)
+		ticks = rng.randint(0, 700)
+		events = engine.advance(ticks)
+		ticked_events = []
+		for tick in range(ticks):
+			if ticked.pet.dead:
+				break
+			ticked_events += ticked.tick()
+		assert state(engine) == state(ticked), (trial, ticks)
+		assert events == ticked_events, (trial, ticks)
+
+
+def test_projection_matches_ticks():
+	rng = random.Random(3)
+	for trial in range(3000):
+		engine = random_engine(rng)
+		projection = engine.projection()
+		ticked = copy(engine)
+		seen = {}
+		if ticked.pet.hunger <= 0:
+			seen['hungry'] = 0
+		if ticked.pet.happiness <= 0:
+			seen['unhappy'] = 0
+		tick = 0
+		while not ticked.pet.dead:
+			tick += 1
+			for event in ticked.tick():
+				seen.setdefault(event, tick)
+			if ticked.pet.hunger <= 0:
+				seen.setdefault('hungry', tick)
+			if ticked.pet.happiness <= 0:
+				seen.setdefault('unhappy', tick)
+		#only what happens before it dies is projected
+		expected = dict((event, ticks) for event, ticks in seen.items()
+			if event in PROJECTED and ticks < seen['dead'] or event == 'dead')
+		assert projection == expected, trial
+
+
+def test_actions_follow_the_game_buttons():
+	engine = Engine(Pet('Test', 50, 50, 50))
+	pet = engine.pet
+	pet.needs_cleaning = True
+	for action in ('feed', 'sleep', 'start_play', 'medicine'):
+		getattr(engine, action)()
+	assert (list(pet.stats.values), pet.sleeping, pet.playing_with_pet) == ([50, 50, 50], False, False)
+	engine.clean()
+
+	pet.sick = True
+	assert engine.sleep() == [] and not pet.sleeping
+	engine.start_play()
+	assert engine.play(True) == [] and pet.happiness == 50
+	assert engine.medicine() == ['cured']
+	assert engine.medicine() == []
+
+	engine.sleep()
+	engine.feed()
+	assert pet.sleeping and pet.hunger == 70
+	assert engine.wake() == ['awake']
@@ -0,0 +1,68 @@
+import random
+
+from Engine import Pet, Engine
+from Journal import JournalStore
+from test_engine import state
+
+ACTIONS = ['feed', 'medicine', 'sleep', 'wake', 'clean', 'discipline']
+
+
+def test_replay_matches_engine(tmp_path):
+	store = JournalStore(str(tmp_path) + '/')
+	rng = random.Random(5)
+	for trial in range(50):
+		engine = Engine(Pet('Pet%d' % trial, rng.randint(1, 100), rng.randint(0, 100), rng.randint(0, 100), 'Light Theme', rng.randint(1, 3)))
+		store.open(engine)
+		#enough records for the journal to be snapshotted again part way through
+		for step in range(rng.randint(0, 1200)):
+			if engine.pet.dead:
+				break
+			choice = rng.random()
+			if choice < 0.6:
+				engine.advance(rng.randint(1, 40))
+			elif choice < 0.7:
+				engine.start_play()
+				engine.play(rng.random() < 0.5)
+			else:
+				getattr(engine, rng.choice(ACTIONS))()
+			if rng.random() < 0.05:
+				store.flush()
+		store.close()
+
+		restored = Engine(Pet())
+		store.restore(engine.pet.name, restored)
+		assert state(restored) == state(engine), trial
+		assert (restored.pet.name, restored.sleep_clock) == (engine.pet.name, engine.sleep_clock), trial
+
+
+def test_names_are_kept_without_reading_the_folder(tmp_path, monkeypatch):
+	directory = str(tmp_path) + '/'
+	with open(directory + 'Old.journal', 'wb'):
+		pass
+	store = JournalStore(directory)
+	monkeypatch.setattr('Journal.glob', None)
+	store.open(Engine(Pet('New')))
+	assert store.names() == ['New', 'Old'] and store.contains('New')
+	store.delete('Old')
+	store.delete('New')
+	assert store.names() == [] and not store.contains('Old')
+	store.close()
+
+
+def test_nothing_waiting_is_lost(tmp_path):
+	store = JournalStore(str(tmp_path) + '/')
+	engine = Engine(Pet('Pet'))
+	store.open(engine)
+	engine.advance(300)
+	engine.feed()
+	#read while the records are still waiting to be written
+	restored = Engine(Pet())
+	store.restore('Pet', restored)
+	assert state(restored) == state(engine)
+
+	engine.advance(20)
+	store.close('Pet')
+	assert store.names() == ['Pet']
+	restored = Engine(Pet())
+	store.restore('Pet', restored)
+	assert state(restored) == state(engine)
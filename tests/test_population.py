@@ -0,0 +1,34 @@
+import random
+
+import pytest
+
+np = pytest.importorskip('numpy')
+
+from Engine import Pet, Engine
+from Population import Population
+
+
+def test_population_matches_engine():
+	rng = random.Random(11)
+	pets = []
+	for i in range(300):
+		pet = Pet('Pet%d' % i, rng.randint(1, 100), rng.randint(0, 100), rng.randint(0, 100), 'Light Theme', rng.randint(1, 3))
+		pet.sick = rng.random() < 0.2
+		pet.sleeping = not pet.sick and rng.random() < 0.2
+		pets.append(pet)
+	population = Population.from_pets(pets)
+	engines = [Engine(pet) for pet in pets]
+	for tick in range(2000):
+		population.tick()
+		for engine in engines:
+			if not engine.pet.dead:
+				engine.tick()
+		#compared every 25 ticks to keep the test quick
+		if tick % 25:
+			continue
+		for i, engine in enumerate(engines):
+			pet = engine.pet
+			assert [population.health[i], population.hunger[i], population.happiness[i], population.age[i]] == \
+				[pet.health, pet.hunger, pet.happiness, pet.age], (tick, i)
+			for state in ('sick', 'dead', 'sleeping', 'needs_discipline', 'needs_cleaning'):
+				assert getattr(population, state)[i] == getattr(pet, state), (tick, i, state)
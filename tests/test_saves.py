@@ -0,0 +1,155 @@
+import os, threading
+
+import pytest
+
+from Engine import Pet
+from Saves import SaveStore, encode, decode, convert
+
+CONTENTS = ('Eggbert', 80, 40, 1, 'Light Theme', 2, True, 1700000000.5)
+
+
+def test_round_trip():
+	assert decode(encode(CONTENTS)) == CONTENTS
+	unknown_time = CONTENTS[:7] + (None,)
+	assert decode(encode(unknown_time)) == unknown_time
+
+
+def test_damaged_save():
+	data = bytearray(encode(CONTENTS))
+	data[-1] ^= 1
+	with pytest.raises(ValueError):
+		decode(bytes(data))
+
+
+@pytest.mark.parametrize('name', ['Eggbert', 'TAMAGOTCHI', 'TAMA'])
+def test_text_saves(name):
+	text = '%s\n80\n40\n1\nLight Theme\n2' % name
+	assert decode(text.encode('utf-8')) == (name, 80, 40, 1, 'Light Theme', 2, False, None)
+
+
+def test_convert(tmp_path):
+	directory = str(tmp_path / 'saves') + '/'
+	store = SaveStore(directory)
+	store.write('Binary', ('Binary',) + CONTENTS[1:])
+	store.close()
+	for name in ('Eggbert', 'TAMAGOTCHI'):
+		with open(directory + name + '.TAMA', 'w') as file:
+			file.write('%s\n80\n40\n1\nLight Theme\n2' % name)
+	with open(directory + 'Broken.TAMA', 'w') as file:
+		file.write('Broken')
+
+	assert convert(directory) == (2, ['Broken'])
+	for name in ('Eggbert', 'TAMAGOTCHI'):
+		with open(directory + name + '.TAMA', 'rb') as file:
+			assert decode(file.read()) == (name, 80, 40, 1, 'Light Theme', 2, False, None)
+	with open(directory + 'Binary.TAMA', 'rb') as file:
+		assert decode(file.read()) == ('Binary',) + CONTENTS[1:]
+
+
+def blocked(store):
+	"""
+	Holds the store's writer thread before it writes anything until the returned event is set.
+	"""
+	go = threading.Event()
+	write, remove = store.write, store.remove
+	store.write = lambda name, contents: (go.wait(5), write(name, contents))
+	store.remove = lambda name: (go.wait(5), remove(name))
+	return go
+
+
+def test_index_is_updated_on_write_and_remove(tmp_path, monkeypatch):
+	directory = str(tmp_path / 'saves') + '/'
+	store = SaveStore(directory)
+	#nothing after this reads the whole folder again
+	monkeypatch.setattr(store, 'rebuild', None)
+	store.write('Eggbert', CONTENTS)
+	store.write('Other', ('Other',) + CONTENTS[1:])
+	assert store.names() == ['Eggbert', 'Other']
+	assert store.stats('Eggbert') == (80, 40, 1, 'Light Theme', 2)
+	store.write('Eggbert', ('Eggbert', 10) + CONTENTS[2:])
+	assert store.stats('Eggbert')[0] == 10
+	store.remove('Other')
+	assert store.names() == ['Eggbert'] and not store.contains('Other')
+	store.close()
+
+
+def test_index_is_kept_until_the_folder_changes(tmp_path, monkeypatch):
+	directory = str(tmp_path / 'saves') + '/'
+	store = SaveStore(directory)
+	store.write('Eggbert', CONTENTS)
+	store.close()
+
+	monkeypatch.setattr(SaveStore, 'rebuild', None)
+	assert SaveStore(directory).names() == ['Eggbert']
+	monkeypatch.undo()
+
+	#another program adds a save and a damaged file
+	with open(directory + 'Added.TAMA', 'wb') as file:
+		file.write(encode(('Added',) + CONTENTS[1:]))
+	with open(directory + 'Broken.TAMA', 'wb') as file:
+		file.write(b'TAMA')
+	store = SaveStore(directory)
+	assert store.names() == ['Added', 'Eggbert']
+	store.close()
+
+
+def test_queued_saves_are_listed(tmp_path):
+	store = SaveStore(str(tmp_path / 'saves') + '/')
+	store.write('Indexed', ('Indexed',) + CONTENTS[1:])
+	go = blocked(store)
+	pet = Pet('Queued')
+	saved = store.save(pet)
+	deleted = store.delete('Indexed')
+	assert store.names() == ['Queued']
+	assert store.contains('Queued') and not store.contains('Indexed') and not store.contains('Missing')
+	assert store.load('Queued')[:6] == ('Queued', 100, 100, 100, 'Light Theme', 1)
+	go.set()
+	assert saved.result(5) == 'Queued' and deleted.result(5) == 'Indexed'
+	assert store.names() == ['Queued'] and store.contains('Queued') and not store.contains('Indexed')
+	store.close()
+
+
+def test_writes_of_the_same_save_are_joined(tmp_path):
+	store = SaveStore(str(tmp_path / 'saves') + '/')
+	written = []
+	write = store.write
+	store.write = lambda name, contents: (written.append(contents), write(name, contents))
+	go = blocked(store)
+	#the first save is taken by the writer, the rest wait behind it
+	first = store.writer.submit('First', ('First',) + CONTENTS[1:])
+	futures = [store.writer.submit('Eggbert', ('Eggbert', health) + CONTENTS[2:]) for health in (10, 20, 30)]
+	go.set()
+	assert [future.result(5) for future in [first] + futures] == ['First'] + ['Eggbert'] * 3
+	assert [contents[:2] for contents in written] == [('First', 80), ('Eggbert', 30)]
+	store.close()
+
+
+def test_a_delete_after_a_save_wins(tmp_path):
+	store = SaveStore(str(tmp_path / 'saves') + '/')
+	go = blocked(store)
+	saved = store.writer.submit('Eggbert', CONTENTS)
+	deleted = store.delete('Eggbert')
+	again = store.writer.submit('Other', ('Other',) + CONTENTS[1:])
+	gone = store.delete('Other')
+	go.set()
+	store.close()
+	assert saved.result() == deleted.result() == 'Eggbert' and again.result() == gone.result() == 'Other'
+	assert store.names() == []
+	assert not os.path.exists(store.path('Eggbert')) and not os.path.exists(store.path('Other'))
+
+
+def test_a_failed_write_leaves_the_old_save(tmp_path, monkeypatch):
+	store = SaveStore(str(tmp_path / 'saves') + '/')
+	store.write('Eggbert', CONTENTS)
+
+	def crash(source, destination):
+		raise OSError('crashed')
+	monkeypatch.setattr('Saves.os.replace', crash)
+	future = store.writer.submit('Eggbert', ('Eggbert', 10) + CONTENTS[2:])
+	with pytest.raises(OSError):
+		future.result(5)
+	monkeypatch.undo()
+	with open(store.path('Eggbert'), 'rb') as file:
+		assert decode(file.read()) == CONTENTS
+	assert store.stats('Eggbert')[0] == 80
+	store.close()
@@ -0,0 +1,134 @@
+import threading, time
+
+import pytest
+
+from Scheduler import Scheduler
+
+TICK = 0.01
+
+
+@pytest.fixture
+def scheduler():
+	scheduler = Scheduler(TICK)
+	thread = threading.Thread(target=scheduler.run, daemon=True)
+	yield scheduler, thread
+	scheduler.cancel()
+	if thread.is_alive():
+		thread.join(1)
+
+
+def wait(event):
+	assert event.wait(2), 'the job never ran'
+
+
+def until(condition):
+	deadline = time.monotonic() + 2
+	while not condition():
+		assert time.monotonic() < deadline, 'the job never ran'
+		time.sleep(TICK / 10)
+
+
+def test_jobs_run_on_their_ticks_in_order(scheduler):
+	scheduler, thread = scheduler
+	ran = []
+	done = threading.Event()
+	scheduler.every(2, lambda clock: ran.append((clock, 'two')))
+	scheduler.every(3, lambda clock: ran.append((clock, 'three')))
+	scheduler.later(12, lambda clock: done.set())
+	thread.start()
+	wait(done)
+	assert ran[:8] == [(2, 'two'), (3, 'three'), (4, 'two'), (6, 'two'), (6, 'three'), (8, 'two'), (9, 'three'), (10, 'two')]
+
+
+def test_does_not_drift(scheduler):
+	scheduler, thread = scheduler
+	done = threading.Event()
+	#each job takes half a tick, which would add up if the next deadline was worked out from the last
+	scheduler.every(1, lambda clock: time.sleep(TICK / 2), count=50)
+	scheduler.later(50, lambda clock: done.set())
+	start = time.monotonic()
+	thread.start()
+	wait(done)
+	assert time.monotonic() - start < 50 * TICK * 1.3
+
+
+def test_pause_and_resume(scheduler):
+	scheduler, thread = scheduler
+	ran = []
+	scheduler.every(1, ran.append)
+	thread.start()
+	time.sleep(5 * TICK)
+	scheduler.pause()
+	paused_at = scheduler.now()
+	count = len(ran)
+	time.sleep(10 * TICK)
+	assert len(ran) == count and scheduler.now() == paused_at
+	scheduler.resume()
+	until(lambda: len(ran) > count)
+	#the clock carries on from where it was paused instead of jumping over the paused time
+	assert scheduler.now() < paused_at + 10
+
+
+def test_cancel(scheduler):
+	scheduler, thread = scheduler
+	ran = []
+	job = scheduler.every(1, ran.append)
+	thread.start()
+	time.sleep(3 * TICK)
+	job.cancel()
+	time.sleep(TICK)
+	count = len(ran)
+	time.sleep(5 * TICK)
+	assert len(ran) == count
+	scheduler.cancel()
+	thread.join(1)
+	assert not thread.is_alive()
+
+
+def test_at_a_tick_that_has_passed_runs_straight_away(scheduler):
+	scheduler, thread = scheduler
+	reached = threading.Event()
+	scheduler.later(10, lambda clock: reached.set())
+	thread.start()
+	wait(reached)
+	ran = threading.Event()
+	clocks = []
+	scheduler.at(3, lambda clock: (clocks.append(clock), ran.set()))
+	wait(ran)
+	assert clocks[0] >= 10
+
+
+def test_set_speed_carries_on_from_the_current_tick(scheduler):
+	scheduler, thread = scheduler
+	scheduler.every(1000, lambda clock: None)
+	thread.start()
+	time.sleep(10 * TICK)
+	before = scheduler.now()
+	scheduler.set_speed(0.5)
+	assert abs(scheduler.now() - before) <= 1
+	time.sleep(10 * TICK)
+	assert scheduler.now() - before <= 7
+
+	#unbounded, a job far in the future runs straight away
+	done = threading.Event()
+	scheduler.later(10000, lambda clock: done.set())
+	scheduler.set_speed(None)
+	wait(done)
+
+
+def test_step_while_paused(scheduler):
+	scheduler, thread = scheduler
+	ran = []
+	scheduler.pause()
+	scheduler.every(3, ran.append)
+	thread.start()
+	time.sleep(5 * TICK)
+	assert ran == [] and scheduler.now() == 0
+	scheduler.step(5)
+	assert scheduler.now() == 5
+	#the windows are brought up to the clock by the step, the jobs wait for it to resume
+	time.sleep(5 * TICK)
+	assert ran == []
+	scheduler.resume()
+	until(lambda: ran)
+	assert ran[0] == 3
@@ -0,0 +1,103 @@
+import asyncio, os, time
+
+from Saves import SaveStore
+from Server import PetServer, Client, REQUEST, ERROR_HEADER, ERROR
+
+
+def test_pet_that_died_while_away_loses_its_save(tmp_path):
+	directory = str(tmp_path / 'saves') + '/'
+	saves = SaveStore(directory)
+	#a weak pet that was saved a long time ago
+	saves.write('Old', ('Old', 1, 0, 0, 'Light Theme', 1, True, time.time() - 10 ** 6))
+	server = PetServer(saves)
+
+	async def run():
+		hosted, events = server.open('Old')
+		assert 'dead' in events and hosted.engine.pet.dead
+		await server.shutdown()
+
+	asyncio.run(run())
+	saves.close()
+	assert not os.path.exists(saves.path('Old'))
+	assert 'Old' not in saves.names()
+
+
+def test_dead_pets_are_not_saved(tmp_path):
+	saves = SaveStore(str(tmp_path / 'saves') + '/')
+	saves.write('Old', ('Old', 1, 0, 0, 'Light Theme', 1, True, time.time() - 10 ** 6))
+	server = PetServer(saves)
+
+	async def run():
+		await server.listen(str(tmp_path / 'socket'))
+		client = await Client.connect(str(tmp_path / 'socket'))
+		state = await client.request('open', 'Old')
+		assert state['dead']
+		try:
+			await client.request('save', 'Old')
+		except ValueError as error:
+			assert 'dead' in str(error)
+		else:
+			assert False, 'a dead pet was saved'
+		await client.close()
+		await server.shutdown()
+
+	asyncio.run(run())
+	saves.close()
+	assert not os.path.exists(saves.path('Old'))
+
+
+
+def test_long_names(tmp_path):
+	server = PetServer()
+	name = 'Long' * 100
+
+	async def run():
+		await server.listen(str(tmp_path / 'socket'))
+		client = await Client.connect(str(tmp_path / 'socket'))
+		state = await client.request('open', name)
+		assert state['name'] == name
+		await client.close()
+		await server.shutdown(save=False)
+
+	asyncio.run(run())
+
+
+def test_long_errors(tmp_path):
+	server = PetServer()
+	name = 'é' * 200
+
+	async def run():
+		await server.listen(str(tmp_path / 'socket'))
+		client = await Client.connect(str(tmp_path / 'socket'))
+		try:
+			await asyncio.wait_for(client.request('feed', name), 5)
+		except ValueError as error:
+			assert str(error) == name + ' is not open'
+		else:
+			assert False, 'a pet that is not open was fed'
+		await client.close()
+		await server.shutdown(save=False)
+
+	asyncio.run(run())
+
+
+def test_unreadable_reply_fails_the_requests(tmp_path):
+	async def reply(reader, writer):
+		await reader.readexactly(REQUEST.size + 1)
+		writer.write(ERROR_HEADER.pack(ERROR, 1) + b'\xff')
+		await writer.drain()
+
+	async def run():
+		server = await asyncio.start_unix_server(reply, str(tmp_path / 'socket'))
+		client = await Client.connect(str(tmp_path / 'socket'))
+		try:
+			await asyncio.wait_for(client.request('feed', 'A'), 5)
+		except UnicodeDecodeError:
+			pass
+		else:
+			assert False, 'an unreadable reply was read'
+		await client.close()
+		server.close()
+		await server.wait_closed()
+
+	asyncio.run(run())